@@ -0,0 +1,861 @@
+import io
+import os
+import wave
+import struct
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import soundfile as sf
+import webrtcvad
+from pydub import AudioSegment
+
+# The master track lifts the voiceover by this much over the music
+VOICEOVER_BOOST_DB = 5
+
+# Music bed fitting
+MUSIC_CROSSFADE_SECONDS = 2.0
+MUSIC_FADE_OUT_SECONDS = 3.0
+
+# Memory budget of the shared decoded-audio cache
+AUDIO_CACHE_BYTES = 1024 * 1024 * 1024
+
+class PCMAudio:
+    """Decoded audio held in memory as float32 samples shaped (frames, channels)"""
+    # (absolute path, mtime_ns, size) of the file this is a native decode of
+    file_key = None
+
+    def __init__(self, samples, frame_rate):
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        self.samples = samples
+        self.frame_rate = int(frame_rate)
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def num_frames(self):
+        return self.samples.shape[0]
+
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return self.num_frames / self.frame_rate
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode an encoded stream (MP3, WAV, FLAC, ...) held in memory"""
+        samples, frame_rate = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+        return cls(samples, frame_rate)
+
+    @classmethod
+    def from_file(cls, path):
+        """Decode an audio file, falling back to pydub for formats libsndfile cannot read"""
+        try:
+            samples, frame_rate = sf.read(path, dtype='float32', always_2d=True)
+            return cls(samples, frame_rate)
+        except RuntimeError:
+            return cls.from_segment(AudioSegment.from_file(path))
+
+    @classmethod
+    def from_segment(cls, segment):
+        """Convert a pydub AudioSegment without touching the disk"""
+        samples = np.array(segment.get_array_of_samples(), dtype=np.float32)
+        samples = samples.reshape(-1, segment.channels)
+        samples /= 2**(segment.sample_width * 8 - 1)
+        return cls(samples, segment.frame_rate)
+
+    def to_mono(self):
+        if self.channels == 1:
+            return self
+        return PCMAudio(self.samples.mean(axis=1), self.frame_rate)
+
+    def resample(self, frame_rate):
+        if frame_rate == self.frame_rate:
+            return self
+        return PCMAudio(resample(self.samples, self.frame_rate, frame_rate), frame_rate)
+
+    def to_int16(self):
+        """Interleaved 16-bit PCM bytes"""
+        return to_int16(self.samples).tobytes()
+
+    def to_segment(self):
+        """Convert to a pydub AudioSegment without touching the disk"""
+        return AudioSegment(data=self.to_int16(), sample_width=2,
+                            frame_rate=self.frame_rate, channels=self.channels)
+
+    def as_whisper_input(self):
+        """Mono 16 kHz float32 array, the format whisper expects in place of a path"""
+        return np.ascontiguousarray(self.to_mono().resample(16000).samples[:, 0])
+
+    def write_wav(self, path):
+        """Write a 16-bit PCM WAV file"""
+        with wave.open(path, 'wb') as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.frame_rate)
+            wav_file.writeframes(self.to_int16())
+
+def to_int16(samples):
+    """Float samples to 16-bit integers, the exact inverse of PCMAudio.from_segment"""
+    return np.clip(np.round(samples * 32768), -32768, 32767).astype(np.int16)
+
+def resample(samples, src_rate, dst_rate):
+    """Resample (frames, channels) float samples with a windowed-sinc anti-alias filter"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+
+    # Low-pass before decimating so content above the new Nyquist does not fold back
+    if dst_rate < src_rate:
+        cutoff = dst_rate / src_rate / 2
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        kernel /= kernel.sum()
+        samples = np.stack([np.convolve(samples[:, c], kernel, mode='same')
+                            for c in range(samples.shape[1])], axis=1)
+
+    # Linear interpolation onto the new sample grid
+    num_out = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(num_out) * (src_rate / dst_rate)
+    source_index = np.arange(len(samples))
+    return np.stack([np.interp(positions, source_index, samples[:, c])
+                     for c in range(samples.shape[1])], axis=1).astype(np.float32)
+
+# WAV sample formats that can be mapped directly: (format tag, bits) -> (dtype, scale)
+WAV_FORMATS = {
+    (1, 16): ('<i2', 1 / 32768),
+    (1, 32): ('<i4', 1 / 2**31),
+    (3, 32): ('<f4', None),
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class WavFrames:
+    """Array-like float32 view of memory-mapped WAV samples shaped (frames, channels).
+
+    Indexing reads only the requested frames from the mapping. Float WAVs
+    are returned as zero-copy read-only views; integer WAVs are scaled to
+    -1..1 one block at a time.
+    """
+    dtype = np.dtype(np.float32)
+    ndim = 2
+
+    def __init__(self, raw, scale):
+        self.raw = raw
+        self.scale = scale
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def nbytes(self):
+        return self.raw.shape[0] * self.raw.shape[1] * self.dtype.itemsize
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        block = self.raw[index]
+        if self.scale is None:
+            return np.asarray(block)
+        return np.multiply(block, np.float32(self.scale), dtype=np.float32)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:], dtype=dtype)
+
+class MappedWav:
+    """A PCM WAV file memory-mapped instead of decoded.
+
+    Exposes frame_rate, channels and samples like PCMAudio, so block-based
+    stages (MixEngine, find_speech_intervals, splice_intervals, play_pcm)
+    read straight from the file without holding it in memory. Conversions
+    that need the whole signal decode it into a PCMAudio first.
+    """
+    def __init__(self, path, dtype, scale, channels, frame_rate, offset, num_frames):
+        self.path = path
+        self.file_key = file_stat_key(path)
+        self.frame_rate = frame_rate
+        raw = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(num_frames, channels))
+        self.samples = WavFrames(raw, scale)
+
+    @classmethod
+    def open(cls, path):
+        """Map a WAV file, or return None if it is not a PCM format that can be mapped"""
+        layout = _wav_layout(path)
+        if layout is None:
+            return None
+        return cls(path, *layout)
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def num_frames(self):
+        return self.samples.shape[0]
+
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return self.num_frames / self.frame_rate
+
+    def to_pcm(self):
+        return PCMAudio(np.asarray(self.samples), self.frame_rate)
+
+    def to_mono(self):
+        return self.to_pcm().to_mono()
+
+    def resample(self, frame_rate):
+        if frame_rate == self.frame_rate:
+            return self
+        return self.to_pcm().resample(frame_rate)
+
+    def as_whisper_input(self):
+        return self.to_pcm().as_whisper_input()
+
+def file_stat_key(path):
+    """(absolute path, mtime_ns, size): changes whenever the file does"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def audio_identity(audio):
+    """Key that is equal for the same audio however it was opened.
+
+    Audio opened from a file, memory-mapped or decoded, is identified by
+    the file; in-memory audio by a hash of its samples, computed once per
+    object.
+    """
+    if audio.file_key is not None:
+        return ('file',) + audio.file_key
+    identity = getattr(audio, '_identity', None)
+    if identity is None:
+        digest = hashlib.blake2b(repr((audio.frame_rate, audio.samples.shape)).encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(audio.samples).data)
+        identity = audio._identity = ('pcm', digest.hexdigest())
+    return identity
+
+def _wav_layout(path):
+    """Find (dtype, scale, channels, frame_rate, data offset, frames) of a WAV file"""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as wav_file:
+        riff = wav_file.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:] != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            header = wav_file.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                data = wav_file.read(chunk_size)
+                tag, channels, frame_rate, _, block_align, bits = struct.unpack('<HHIIHH', data[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(data) >= 26:
+                    tag = struct.unpack('<H', data[24:26])[0]
+                fmt = (tag, bits, channels, frame_rate, block_align)
+                wav_file.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    return None
+                tag, bits, channels, frame_rate, block_align = fmt
+                if (tag, bits) not in WAV_FORMATS or block_align != channels * bits // 8:
+                    return None
+                dtype, scale = WAV_FORMATS[(tag, bits)]
+                offset = wav_file.tell()
+                # Streamed WAVs may leave the data size unset
+                data_size = min(chunk_size, file_size - offset)
+                return dtype, scale, channels, frame_rate, offset, data_size // block_align
+            else:
+                wav_file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+class DecodedAudioCache:
+    """Process-wide LRU cache of decoded audio files.
+
+    Entries are keyed by absolute path, modification time, size and target
+    format, so an edited file is decoded again while the GUI, the mixer and
+    the backend all share one decode of an unchanged one. Cached samples are
+    read-only; the least recently used entries are evicted once the total
+    size exceeds max_bytes.
+    """
+    def __init__(self, max_bytes=AUDIO_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """Decoded PCMAudio of path"""
+        file_key = file_stat_key(path)
+        audio = self._lookup(file_key + (None, None))
+        if audio is None:
+            audio = PCMAudio.from_file(path)
+            audio.file_key = file_key
+            audio = self._store(file_key + (None, None), audio)
+        return audio
+
+    def convert(self, audio, frame_rate=None, channels=None):
+        """audio converted to frame_rate and channels, cached if it was opened from a file.
+
+        Audio already in the requested format is returned as is and not
+        stored again.
+        """
+        if audio.file_key is None:
+            return convert_format(audio, frame_rate, channels)
+        key = audio.file_key + (frame_rate, channels)
+        converted = self._lookup(key)
+        if converted is not None:
+            return converted
+        converted = convert_format(audio, frame_rate, channels)
+        if converted is audio:
+            return audio
+        return self._store(key, converted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _lookup(self, key):
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+            return audio
+
+    def _store(self, key, audio):
+        audio.samples.flags.writeable = False
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+            self.entries[key] = audio
+            self.size += audio.samples.nbytes
+            # Evict least recently used entries, always keeping the newest
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.samples.nbytes
+        return audio
+
+audio_cache = DecodedAudioCache()
+
+# Memory-mapped WAVs currently open, so every open of a file shares one object
+_mapped_files = weakref.WeakValueDictionary()
+_mapped_lock = threading.Lock()
+
+def convert_format(audio, frame_rate=None, channels=None):
+    """Convert a PCMAudio to the given frame rate and channel count"""
+    if frame_rate is not None:
+        audio = audio.resample(frame_rate)
+    if channels is not None and channels != audio.channels:
+        audio = PCMAudio(match_channels(audio.samples, channels), audio.frame_rate)
+    return audio
+
+def load_pcm(source):
+    """Get a PCMAudio from a file path or an in-memory PCMAudio.
+
+    Files are decoded through the shared audio_cache; the result must not be
+    modified in place.
+    """
+    if isinstance(source, PCMAudio):
+        return source
+    return audio_cache.get(source)
+
+def open_audio(source):
+    """Get audio for block-based processing from a file path or in-memory audio.
+
+    PCM WAV files are memory-mapped; other files are decoded through
+    load_pcm. Either way an unchanged file resolves to the same object on
+    every call.
+    """
+    if isinstance(source, (PCMAudio, MappedWav)):
+        return source
+    if os.path.splitext(source)[1].lower() == '.wav':
+        key = file_stat_key(source)
+        with _mapped_lock:
+            mapped = _mapped_files.get(key)
+            if mapped is None:
+                mapped = MappedWav.open(source)
+                if mapped is not None:
+                    _mapped_files[key] = mapped
+        if mapped is not None:
+            return mapped
+    return load_pcm(source)
+
+def whisper_input(source):
+    """Get something whisper can transcribe from a file path or in-memory audio"""
+    if isinstance(source, (PCMAudio, MappedWav)):
+        return source.as_whisper_input()
+    return source
+
+def vad_speech_mask(samples, frame_rate, mode=2, frame_ms=10):
+    """Run webrtcvad over a mono float signal; returns one bool per frame.
+
+    The signal must be at 8, 16, 32 or 48 kHz.
+    """
+    vad = webrtcvad.Vad()
+    vad.set_mode(mode)  # Aggressiveness level (0-3)
+
+    frame_size = int(frame_rate * frame_ms / 1000)
+    num_frames = len(samples) // frame_size
+    pcm = to_int16(samples[:num_frames * frame_size])
+    frames = pcm.reshape(num_frames, frame_size)
+    return np.fromiter((vad.is_speech(frame.tobytes(), frame_rate) for frame in frames),
+                       dtype=bool, count=num_frames)
+
+def match_channels(samples, channels):
+    """Up- or down-mix (frames, channels) samples to the given channel count"""
+    if samples.shape[1] == channels:
+        return samples
+    samples = np.asarray(samples)
+    if samples.shape[1] == 1:
+        return np.repeat(samples, channels, axis=1)
+    return np.repeat(samples.mean(axis=1, keepdims=True), channels, axis=1)
+
+class MusicBed:
+    """Music looped to an exact length, generated block by block.
+
+    Each repeat overlaps the end of the previous one with an equal-power
+    crossfade, and the bed fades out over its last fade_out frames. Blocks
+    are computed from the source on demand, so memory use does not depend
+    on the bed length.
+    """
+    def __init__(self, source, length, crossfade, fade_out):
+        self.source = source
+        self.length = length
+        self.crossfade = min(crossfade, len(source) // 2)
+        self.period = len(source) - self.crossfade
+        self.fade_out = min(fade_out, length)
+
+    def read(self, start, num_frames):
+        """Bed samples for frames [start, start + num_frames)"""
+        end = min(start + num_frames, self.length)
+        channels = self.source.shape[1]
+        if end <= start or self.period <= 0:
+            return np.zeros((max(end - start, 0), channels), dtype=np.float32)
+
+        positions = np.arange(start, end)
+        repeat, offset = np.divmod(positions, self.period)
+        block = self.source[offset]
+
+        # Crossfade the head of each repeat with the tail of the previous one
+        overlap = (repeat > 0) & (offset < self.crossfade)
+        if overlap.any():
+            head = offset[overlap]
+            angle = ((head + 0.5) / self.crossfade * (np.pi / 2)).astype(np.float32)[:, np.newaxis]
+            block[overlap] = (self.source[head] * np.sin(angle)
+                              + self.source[head + self.period] * np.cos(angle))
+
+        # Fade out at the end of the bed
+        if self.fade_out and end > self.length - self.fade_out:
+            remaining = (self.length - positions).astype(np.float32) / self.fade_out
+            block *= np.minimum(remaining, 1.0)[:, np.newaxis]
+        return block
+
+class MixEngine:
+    """Block-based mixer of a voiceover and a music bed.
+
+    Both tracks are converted once to a common rate and channel count, the
+    highest of the two like pydub's overlay. Each block is summed on the fly
+    with the gains given for that block, so the live preview and the offline
+    master track run the same arithmetic and produce identical samples.
+    The mix is as long as the voiceover; the music is looped to fit.
+    An optional ducking curve (music gain per DUCKING_FRAME_MS, see AutoMix)
+    is applied on top of the music gain.
+    """
+    def __init__(self, voiceover, music, crossfade_seconds=MUSIC_CROSSFADE_SECONDS,
+                 fade_out_seconds=MUSIC_FADE_OUT_SECONDS, ducking=None):
+        self.frame_rate = max(voiceover.frame_rate, music.frame_rate)
+        self.channels = max(voiceover.channels, music.channels)
+        # Conversions of files go through audio_cache, so a new engine for
+        # the same tracks does not resample them again
+        self.voiceover = audio_cache.convert(voiceover, self.frame_rate, self.channels).samples
+        self.music = MusicBed(audio_cache.convert(music, self.frame_rate, self.channels).samples,
+                              len(self.voiceover),
+                              int(crossfade_seconds * self.frame_rate),
+                              int(fade_out_seconds * self.frame_rate))
+        self.vo_boost = 10 ** (VOICEOVER_BOOST_DB / 20)
+        self.ducking = ducking
+
+    @property
+    def num_frames(self):
+        return len(self.voiceover)
+
+    @property
+    def duration(self):
+        return self.num_frames / self.frame_rate
+
+    def render(self, start, num_frames, vo_gain, bg_gain):
+        """Mix num_frames frames from frame start; shorter at the end of the voiceover"""
+        end = min(start + num_frames, self.num_frames)
+        if end <= start:
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        block = self.voiceover[start:end] * np.float32(vo_gain * self.vo_boost)
+        music = self.music.read(start, end - start) * np.float32(bg_gain)
+        if self.ducking is not None and len(self.ducking):
+            frames = np.arange(start, end) * (1000 / (DUCKING_FRAME_MS * self.frame_rate))
+            gain = np.interp(frames, np.arange(len(self.ducking)), self.ducking)
+            music *= gain.astype(np.float32)[:, np.newaxis]
+        block += music
+        return np.clip(block, -1.0, 1.0, out=block)
+
+    def render_all(self, vo_gain, bg_gain, block_size=65536):
+        """Render the whole mix offline, block by block"""
+        blocks = [self.render(start, block_size, vo_gain, bg_gain)
+                  for start in range(0, self.num_frames, block_size)]
+        if not blocks:
+            return PCMAudio(np.zeros((0, self.channels)), self.frame_rate)
+        return PCMAudio(np.concatenate(blocks), self.frame_rate)
+
+VAD_RATES = (8000, 16000, 32000, 48000)
+
+VAD_BLOCK_FRAMES = 3000
+
+def _vad_blocks(audio, vad_rate, frame_ms=10):
+    """Read audio once in blocks of VAD_BLOCK_FRAMES VAD frames.
+
+    Yields (source block, mono block at vad_rate); the source blocks are
+    contiguous and cover every frame of the audio.
+    """
+    samples = audio.samples
+    # Nearest-sample decimation is enough for VAD decisions
+    step = audio.frame_rate / vad_rate
+    num_out = int(audio.num_frames * vad_rate / audio.frame_rate)
+    weights = np.full(audio.channels, 1 / audio.channels, dtype=np.float32)
+
+    block_size = int(vad_rate * frame_ms / 1000) * VAD_BLOCK_FRAMES
+    for start in range(0, num_out, block_size):
+        end = min(start + block_size, num_out)
+        first = int(start * step)
+        last = int(end * step) if end < num_out else audio.num_frames
+        block = samples[first:last]
+        if vad_rate == audio.frame_rate:
+            vad_block = block[:end - start]
+        else:
+            vad_block = block[(np.arange(start, end) * step).astype(np.int64) - first]
+        yield block, vad_block @ weights
+
+def _vad_rate(frame_rate):
+    return frame_rate if frame_rate in VAD_RATES else 16000
+
+def _speech_runs(speech, frame_ms, merge_gap_ms):
+    """Start and end frame of each speech run, merging runs split by short gaps"""
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return starts, ends
+
+    # Merge runs whose gap is within merge_gap_ms
+    split = (starts[1:] - ends[:-1]) * frame_ms > merge_gap_ms
+    starts = starts[np.concatenate(([True], split))]
+    ends = ends[np.concatenate((split, [True]))]
+    return starts, ends
+
+def find_speech_intervals(audio, mode=2, merge_gap_ms=50):
+    """Find speech in a PCMAudio with VAD; returns (start, end) seconds as a (k, 2) array.
+
+    Speech runs separated by no more than merge_gap_ms are merged. The
+    audio is read VAD_BLOCK_FRAMES VAD frames at a time.
+    """
+    frame_ms = 10
+    vad_rate = _vad_rate(audio.frame_rate)
+    masks = [vad_speech_mask(mono, vad_rate, mode, frame_ms)
+             for _, mono in _vad_blocks(audio, vad_rate, frame_ms)]
+    speech = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+
+    starts, ends = _speech_runs(speech, frame_ms, merge_gap_ms)
+    if len(starts) == 0:
+        return np.zeros((0, 2))
+    return np.column_stack((starts, ends)) * (frame_ms / 1000)
+
+class EditDecisionList:
+    """An edit that keeps source intervals and joins them with crossfades.
+
+    starts and ends are the kept source frames; each interval begins at
+    output_starts in the edited audio, overlapping the previous one by the
+    crossfade. The list is the only record needed to move source times,
+    such as cached word timings, onto the edited timeline.
+    """
+    def __init__(self, starts, ends, frame_rate, num_frames, fade):
+        self.starts = starts
+        self.ends = ends
+        self.frame_rate = frame_rate
+        self.num_frames = num_frames
+        self.fade = fade
+        lengths = ends - starts
+        self.output_starts = (np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                              - np.arange(len(starts)) * fade)
+
+    @classmethod
+    def from_intervals(cls, audio, intervals, crossfade_ms=5):
+        """Edit keeping the given (start, end) second intervals of audio"""
+        rate = audio.frame_rate
+        starts = np.clip(np.round(intervals[:, 0] * rate).astype(np.int64), 0, audio.num_frames)
+        ends = np.clip(np.round(intervals[:, 1] * rate).astype(np.int64), 0, audio.num_frames)
+        keep = ends > starts
+        starts, ends = starts[keep], ends[keep]
+        lengths = ends - starts
+        fade = min(int(rate * crossfade_ms / 1000), int(lengths.min()) // 2) if len(starts) > 1 else 0
+        return cls(starts, ends, rate, audio.num_frames, fade)
+
+    @property
+    def intervals(self):
+        """Kept (start, end) seconds as a (k, 2) array"""
+        return np.column_stack((self.starts, self.ends)) / self.frame_rate
+
+    @property
+    def output_frames(self):
+        return int((self.ends - self.starts).sum()) - max(len(self.starts) - 1, 0) * self.fade
+
+    def map_times(self, times):
+        """Move source times in seconds onto the edited timeline.
+
+        Times inside a cut snap to the nearest kept boundary before it.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if len(self.starts) == 0:
+            return np.zeros_like(times)
+        frames = times * self.frame_rate
+        index = np.clip(np.searchsorted(self.starts, frames, side='right') - 1, 0, None)
+        offset = np.clip(frames - self.starts[index], 0, self.ends[index] - self.starts[index])
+        return (self.output_starts[index] + offset) / self.frame_rate
+
+    def apply(self, audio):
+        """Splice audio into an EditedAudio.
+
+        The output is assembled with a single gather from the source samples
+        and the precomputed crossfades.
+        """
+        rate = audio.frame_rate
+        starts, ends, fade = self.starts, self.ends, self.fade
+        if len(starts) == 0:
+            return EditedAudio(np.zeros((0, audio.channels)), rate, audio, self)
+
+        lengths = ends - starts
+        if fade == 0:
+            return EditedAudio(audio.samples[_concat_ranges(starts, lengths)], rate, audio, self)
+
+        # Crossfade the tail of each interval into the head of the next
+        ramp = np.linspace(0.0, 1.0, fade + 2, dtype=np.float32)[1:-1, np.newaxis]
+        offsets = np.arange(fade)
+        tails = audio.samples[(ends[:-1] - fade)[:, np.newaxis] + offsets]
+        heads = audio.samples[starts[1:][:, np.newaxis] + offsets]
+        blends = (tails * (1 - ramp) + heads * ramp).reshape(-1, audio.channels)
+
+        # Interleave trimmed intervals with their crossfades
+        piece_starts = starts + fade
+        piece_starts[0] = starts[0]
+        piece_ends = ends - fade
+        piece_ends[-1] = ends[-1]
+        range_starts = np.empty(2 * len(starts) - 1, dtype=np.int64)
+        range_lengths = np.empty_like(range_starts)
+        range_starts[0::2] = piece_starts
+        range_lengths[0::2] = piece_ends - piece_starts
+        range_starts[1::2] = audio.num_frames + np.arange(len(starts) - 1) * fade
+        range_lengths[1::2] = fade
+
+        # Gather from the source and the blends without concatenating them first
+        index = _concat_ranges(range_starts, range_lengths)
+        from_source = index < audio.num_frames
+        output = np.empty((len(index), audio.channels), dtype=np.float32)
+        output[from_source] = audio.samples[index[from_source]]
+        output[~from_source] = blends[index[~from_source] - audio.num_frames]
+        return EditedAudio(output, rate, audio, self)
+
+class EditedAudio(PCMAudio):
+    """PCMAudio produced by an EditDecisionList, remembering its source"""
+    def __init__(self, samples, frame_rate, source, edl):
+        super().__init__(samples, frame_rate)
+        self.source = source
+        self.edl = edl
+
+def unwrap_edits(audio):
+    """Original audio behind any edits, and the edits in the order they were applied"""
+    edls = []
+    while isinstance(audio, EditedAudio):
+        edls.append(audio.edl)
+        audio = audio.source
+    return audio, edls[::-1]
+
+def splice_intervals(audio, intervals, crossfade_ms=5):
+    """Keep only the given (start, end) second intervals, crossfading each joint"""
+    return EditDecisionList.from_intervals(audio, intervals, crossfade_ms).apply(audio)
+
+def _concat_ranges(starts, lengths):
+    """Indices of the concatenated ranges [start, start + length)"""
+    shift = starts - np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.repeat(shift, lengths) + np.arange(lengths.sum())
+
+def deadspace_edl(audio, mode=2, merge_gap_ms=50, crossfade_ms=5):
+    """Edit decision list that removes silence found by VAD, or None if there is no speech"""
+    intervals = find_speech_intervals(audio, mode, merge_gap_ms)
+    if len(intervals) == 0:
+        return None
+    return EditDecisionList.from_intervals(audio, intervals, crossfade_ms)
+
+def remove_deadspace(audio, mode=2, merge_gap_ms=50, crossfade_ms=5):
+    """Remove silence from a PCMAudio using VAD, keeping the original quality"""
+    edl = deadspace_edl(audio, mode, merge_gap_ms, crossfade_ms)
+    if edl is None:
+        return audio
+    return edl.apply(audio)
+
+# Loudness measurement (ITU-R BS.1770)
+LOUDNESS_SEGMENT_SECONDS = 0.1
+LOUDNESS_BLOCK_SEGMENTS = 4
+LOUDNESS_ABSOLUTE_GATE = -70.0
+LOUDNESS_RELATIVE_GATE = -10.0
+
+# Automatic mix: voice loudness, music bed level in speech gaps, and how far
+# the music ducks under speech
+AUTO_VOICE_LUFS = -16.0
+AUTO_MUSIC_BELOW_VOICE_LU = 8.0
+DUCKING_DB = 9.0
+DUCKING_HOLD_MS = 400
+DUCKING_RAMP_MS = 200
+DUCKING_FRAME_MS = 10
+
+def _biquad_power(b, a, freqs, frame_rate):
+    """Squared magnitude response of a biquad at the given frequencies"""
+    z = np.exp(-2j * np.pi * freqs / frame_rate)
+    return np.abs(np.polyval(b[::-1], z) / np.polyval(a[::-1], z)) ** 2
+
+def k_weighting_power(freqs, frame_rate):
+    """Squared magnitude of the BS.1770 K-weighting filter (shelf plus high-pass)"""
+    # High shelf: +4 dB above about 1.5 kHz
+    gain = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / frame_rate
+    alpha = np.sin(w0) / (2 * (1 / np.sqrt(2)))
+    cos_w0, root = np.cos(w0), 2 * np.sqrt(gain) * alpha
+    shelf_b = np.array([gain * ((gain + 1) + (gain - 1) * cos_w0 + root),
+                        -2 * gain * ((gain - 1) + (gain + 1) * cos_w0),
+                        gain * ((gain + 1) + (gain - 1) * cos_w0 - root)])
+    shelf_a = np.array([(gain + 1) - (gain - 1) * cos_w0 + root,
+                        2 * ((gain - 1) - (gain + 1) * cos_w0),
+                        (gain + 1) - (gain - 1) * cos_w0 - root])
+
+    # High-pass at 38 Hz
+    w0 = 2 * np.pi * 38.0 / frame_rate
+    alpha = np.sin(w0) / (2 * 0.5)
+    cos_w0 = np.cos(w0)
+    pass_b = np.array([(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2])
+    pass_a = np.array([1 + alpha, -2 * cos_w0, 1 - alpha])
+
+    return (_biquad_power(shelf_b, shelf_a, freqs, frame_rate)
+            * _biquad_power(pass_b, pass_a, freqs, frame_rate))
+
+class LoudnessMeter:
+    """Integrated loudness of audio fed in blocks of any size.
+
+    The K-weighted mean square of every 100 ms segment is computed in the
+    frequency domain, a whole block of segments per FFT call, and the
+    gated 400 ms blocks of BS.1770 are formed from those segments.
+    """
+    def __init__(self, frame_rate):
+        self.frame_rate = frame_rate
+        self.segment = int(round(frame_rate * LOUDNESS_SEGMENT_SECONDS))
+        freqs = np.fft.rfftfreq(self.segment, 1 / frame_rate)
+        # Parseval weights: bins other than DC and Nyquist stand for two
+        weights = np.full(len(freqs), 2.0)
+        weights[0] = 1.0
+        if self.segment % 2 == 0:
+            weights[-1] = 1.0
+        self.weights = (weights * k_weighting_power(freqs, frame_rate)
+                        / self.segment ** 2).astype(np.float32)
+        self.pending = None
+        self.energies = []
+
+    def add(self, block):
+        """Feed the next (frames, channels) samples"""
+        if self.pending is not None and len(self.pending):
+            block = np.concatenate((self.pending, block))
+        count = len(block) // self.segment
+        self.pending = np.array(block[count * self.segment:])
+        if count == 0:
+            return
+        segments = np.asarray(block[:count * self.segment]).reshape(count, self.segment, -1)
+        spectra = np.fft.rfft(segments, axis=1)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        # Mean square per segment, summed over channels
+        self.energies.append(np.einsum('sfc,f->s', power, self.weights))
+
+    @property
+    def integrated(self):
+        """Gated integrated loudness in LUFS, or -inf for silence"""
+        if not self.energies:
+            return float('-inf')
+        energies = np.concatenate(self.energies)
+        if len(energies) < LOUDNESS_BLOCK_SEGMENTS:
+            blocks = np.array([energies.mean()])
+        else:
+            # 400 ms blocks with 75% overlap
+            window = np.ones(LOUDNESS_BLOCK_SEGMENTS) / LOUDNESS_BLOCK_SEGMENTS
+            blocks = np.convolve(energies, window, mode='valid')
+
+        with np.errstate(divide='ignore'):
+            loudness = -0.691 + 10 * np.log10(blocks)
+        gated = blocks[loudness > LOUDNESS_ABSOLUTE_GATE]
+        if len(gated) == 0:
+            return float('-inf')
+        relative_gate = -0.691 + 10 * np.log10(gated.mean()) + LOUDNESS_RELATIVE_GATE
+        gated = blocks[(loudness > LOUDNESS_ABSOLUTE_GATE) & (loudness > relative_gate)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def integrated_loudness(audio, block_frames=1 << 20):
+    """Integrated loudness of a PCMAudio or MappedWav in LUFS"""
+    meter = LoudnessMeter(audio.frame_rate)
+    for start in range(0, audio.num_frames, block_frames):
+        meter.add(audio.samples[start:start + block_frames])
+    return meter.integrated
+
+def analyze_voiceover(audio, mode=2):
+    """Integrated loudness and VAD speech mask (one bool per 10 ms) in a single read"""
+    vad_rate = _vad_rate(audio.frame_rate)
+    meter = LoudnessMeter(audio.frame_rate)
+    masks = []
+    for block, mono in _vad_blocks(audio, vad_rate, DUCKING_FRAME_MS):
+        meter.add(block)
+        masks.append(vad_speech_mask(mono, vad_rate, mode, DUCKING_FRAME_MS))
+    speech = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    return meter.integrated, speech
+
+def ducking_curve(speech, depth_db=DUCKING_DB):
+    """Music gain per 10 ms frame from a VAD speech mask.
+
+    Speech runs closer than DUCKING_HOLD_MS are held down together so the
+    music does not pump between words, and every change is spread over
+    DUCKING_RAMP_MS, centred so the music starts to duck just before the
+    voice comes in.
+    """
+    held = np.zeros(len(speech), dtype=bool)
+    starts, ends = _speech_runs(speech, DUCKING_FRAME_MS, DUCKING_HOLD_MS)
+    held[_concat_ranges(starts, ends - starts)] = True
+
+    ducked = np.where(held, 10 ** (-depth_db / 20), 1.0)
+    ramp = max(1, DUCKING_RAMP_MS // DUCKING_FRAME_MS)
+    padded = np.pad(ducked, ramp // 2, mode='edge')
+    return np.convolve(padded, np.ones(ramp) / ramp, mode='same')[ramp // 2:ramp // 2 + len(ducked)].astype(np.float32)
+
+class AutoMix:
+    """Gains and music ducking for a voiceover and music bed, from one analysis.
+
+    vo_gain brings the boosted voiceover to AUTO_VOICE_LUFS, bg_gain puts
+    the music AUTO_MUSIC_BELOW_VOICE_LU below it in speech gaps, and
+    ducking lowers the music by DUCKING_DB under speech.
+    """
+    def __init__(self, voiceover, music, mode=2):
+        self.vo_loudness, speech = analyze_voiceover(voiceover, mode)
+        self.bg_loudness = integrated_loudness(music)
+        self.ducking = ducking_curve(speech)
+
+        self.vo_gain = 1.0
+        if np.isfinite(self.vo_loudness):
+            self.vo_gain = 10 ** ((AUTO_VOICE_LUFS - VOICEOVER_BOOST_DB - self.vo_loudness) / 20)
+        self.bg_gain = 1.0
+        if np.isfinite(self.bg_loudness):
+            target = AUTO_VOICE_LUFS - AUTO_MUSIC_BELOW_VOICE_LU
+            self.bg_gain = 10 ** ((target - self.bg_loudness) / 20)
@@ -1,22 +1,174 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import numpy as np
-from pydub import AudioSegment
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pygame
-import io
+import queue
 import threading
-import os
-import tempfile
-import webrtcvad
+import time
+from audio_engine import MixEngine, AutoMix, open_audio, remove_deadspace, audio_identity
+from waveform import PeakPyramid
+from playback import play_pcm, is_playing, LiveMix
+
+class WaveformView(tk.Canvas):
+    """Waveform drawn on a Tk Canvas from a PeakPyramid.
+
+    The envelope is a single line item built from at most one min/max pair
+    per pixel of the visible range, so redraws for gain, zoom and resize
+    take milliseconds. The mouse wheel zooms around the pointer,
+    double-click shows the whole file, a click seeks through on_seek, and
+    set_playhead marks the playback position.
+    """
+    HEIGHT = 150
+    AXIS_HEIGHT = 18
+    Y_RANGE = 1.1
+    MIN_SPAN = 0.05
+    ZOOM_STEP = 1.25
+
+    def __init__(self, parent, on_seek=None, **kwargs):
+        super().__init__(parent, height=self.HEIGHT, background='white',
+                         highlightthickness=0, **kwargs)
+        self.on_seek = on_seek
+        self.peaks = None
+        self.gain = 1.0
+        self.duration = 0.0
+        self.view_start = 0.0
+        self.view_end = 0.0
+        self.playhead = None
+        self._redraw_job = None
+
+        self.bind('<Configure>', lambda event: self.redraw())
+        self.bind('<MouseWheel>', lambda event: self._zoom_at(event.x, event.delta > 0))
+        self.bind('<Button-4>', lambda event: self._zoom_at(event.x, True))
+        self.bind('<Button-5>', lambda event: self._zoom_at(event.x, False))
+        self.bind('<Double-Button-1>', lambda event: self.zoom_reset())
+        self.bind('<Button-1>', self._click)
+
+    def set_peaks(self, peaks, gain, duration=None):
+        """Show newly loaded or processed audio.
+
+        duration sets the time axis when peaks cover only part of a file
+        that is still loading.
+        """
+        # Redrawn right away, so a pending coalesced redraw is not needed
+        self._cancel_redraw()
+        self.peaks = peaks
+        self.gain = gain
+        duration = duration or (peaks.duration if peaks is not None else 0.0)
+        if duration != self.duration:
+            self.duration = duration
+            self.view_start, self.view_end = 0.0, duration
+        self.redraw()
+
+    def set_gain(self, gain):
+        """Redraw for a new gain, coalescing rapid slider moves into one redraw"""
+        self.gain = gain
+        if self._redraw_job is None:
+            self._redraw_job = self.after_idle(self._idle_redraw)
+
+    def _idle_redraw(self):
+        self._redraw_job = None
+        self.redraw()
+
+    def _cancel_redraw(self):
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+
+    def destroy(self):
+        self._cancel_redraw()
+        super().destroy()
+
+    def is_clipping(self):
+        """Clipping check from the cached peak maximum"""
+        return self.peaks is not None and self.peaks.peak * self.gain > 1
+
+    def zoom_reset(self):
+        self.view_start, self.view_end = 0.0, self.duration
+        self.redraw()
+
+    def set_playhead(self, seconds):
+        """Move the playhead to seconds, or hide it with None"""
+        self.playhead = seconds
+        self.delete('playhead')
+        if seconds is not None and self.view_start <= seconds <= self.view_end:
+            x = self._x(seconds)
+            self.create_line(x, 0, x, self._plot_height(), fill='green', width=2, tags='playhead')
+
+    def redraw(self):
+        self.delete('all')
+        width = self.winfo_width()
+        if width <= 1 or self.view_end <= self.view_start:
+            return
+        height = self._plot_height()
+        middle = height / 2
+
+        # Zero line, full-scale guides and time axis
+        self.create_line(0, middle, width, middle, fill='#cccccc')
+        for level in (-1.0, 1.0):
+            y = self._y(level)
+            self.create_line(0, y, width, y, fill='#eeeeee', dash=(2, 2))
+        self._draw_axis(width, height)
+
+        if self.peaks is not None:
+            times, mins, maxs = self.peaks.peaks(width, self.view_start, self.view_end)
+            if len(times) > 1:
+                x = np.repeat(self._x(times), 2)
+                y = self._y(np.column_stack((mins, maxs)).ravel() * self.gain)
+                coords = np.column_stack((x, y)).ravel().tolist()
+                self.create_line(*coords, fill='red' if self.is_clipping() else 'blue')
+
+        self.set_playhead(self.playhead)
+
+    def _draw_axis(self, width, height):
+        span = self.view_end - self.view_start
+        # Round the tick spacing to 1, 2 or 5 times a power of ten
+        raw = span / max(width / 100, 1)
+        magnitude = 10 ** np.floor(np.log10(raw))
+        step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+        tick = np.ceil(self.view_start / step) * step
+        while tick <= self.view_end:
+            x = self._x(tick)
+            self.create_line(x, height, x, height + 4, fill='gray')
+            self.create_text(x, height + 4, text=f"{tick:g}s", anchor='n',
+                             fill='gray', font=('Arial', 8))
+            tick += step
+
+    def _plot_height(self):
+        return max(self.winfo_height(), self.HEIGHT) - self.AXIS_HEIGHT
+
+    def _x(self, seconds):
+        return (seconds - self.view_start) / (self.view_end - self.view_start) * self.winfo_width()
+
+    def _y(self, value):
+        middle = self._plot_height() / 2
+        return middle - value / self.Y_RANGE * middle
+
+    def _time_at(self, x):
+        return self.view_start + x / self.winfo_width() * (self.view_end - self.view_start)
+
+    def _zoom_at(self, x, zoom_in):
+        """Zoom in or out keeping the time under the pointer in place"""
+        if self.duration <= 0:
+            return
+        anchor = self._time_at(x)
+        span = self.view_end - self.view_start
+        span = span / self.ZOOM_STEP if zoom_in else span * self.ZOOM_STEP
+        span = min(max(span, self.MIN_SPAN), self.duration)
+        start = anchor - (anchor - self.view_start) * span / (self.view_end - self.view_start)
+        start = min(max(start, 0.0), self.duration - span)
+        self.view_start, self.view_end = start, start + span
+        self.redraw()
+
+    def _click(self, event):
+        if self.on_seek is not None and self.duration > 0:
+            self.on_seek(min(max(self._time_at(event.x), 0.0), self.duration))
 
 class AudioPreviewWidget(ttk.Frame):
     def __init__(self, parent, label_text="Audio File"):
         super().__init__(parent)
         self.audio_data = None
+        self.peaks = None
+        self.sound = None
         self.playing = False
-        self.pygame_initialized = False
         
         # Initialize GUI elements
         self.setup_gui(label_text)
@@ -26,9 +178,8 @@ class AudioPreviewWidget(ttk.Frame):
         ttk.Label(self, text=label_text).pack(pady=5)
         
         # Waveform display
-        self.fig, self.ax = plt.subplots(figsize=(8, 2))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().pack(fill='x', expand=True)
+        self.waveform = WaveformView(self)
+        self.waveform.pack(fill='x', expand=True)
         
         # Volume control
         volume_frame = ttk.Frame(self)
@@ -41,7 +192,7 @@ class AudioPreviewWidget(ttk.Frame):
             to=200, 
             orient='horizontal', 
             variable=self.volume_var,
-            command=self.update_waveform
+            command=self.update_gain
         )
         self.volume_slider.pack(side='left', fill='x', expand=True, padx=5)
         
@@ -57,118 +208,55 @@ class AudioPreviewWidget(ttk.Frame):
     def load_audio(self, audio_path):
         """Load audio file and display waveform"""
         try:
-            self.audio_data = AudioSegment.from_file(audio_path)
+            self.audio_data = open_audio(audio_path)
             self.audio_path = audio_path
+            self.peaks = PeakPyramid(self.audio_data.samples, self.audio_data.frame_rate)
             self.update_waveform()
             self.play_button['state'] = 'normal'
             
-            # Initialize pygame mixer if not already done
-            if not self.pygame_initialized:
-                pygame.mixer.init()
-                self.pygame_initialized = True
-            
             return True
         except Exception as e:
             print(f"Error loading audio: {e}")
             return False
             
     def update_waveform(self, *args):
-        """Update waveform display with current volume"""
-        if self.audio_data is None:
-            return
-            
-        # Clear previous plot
-        self.ax.clear()
-        
-        # Get samples and apply volume
-        samples = np.array(self.audio_data.get_array_of_samples())
-        volume_factor = self.volume_var.get() / 100.0
-        adjusted_samples = samples * volume_factor
-        
-        # Calculate normalized samples for visualization
-        max_possible = 2**(self.audio_data.sample_width * 8 - 1)
-        normalized = adjusted_samples / max_possible
+        """Redraw waveform display for the loaded audio"""
+        self.waveform.set_peaks(self.peaks, self.volume_var.get() / 100.0)
         
-        # Plot waveform
-        time = np.linspace(0, len(normalized)/self.audio_data.frame_rate, len(normalized))
-        self.ax.plot(time, normalized, linewidth=0.5, 
-                    color='red' if np.max(np.abs(normalized)) > 1 else 'blue')
-        
-        # Set plot properties
-        self.ax.set_ylim(-1.1, 1.1)
-        self.ax.set_xlabel('Time (s)')
-        self.ax.grid(True, alpha=0.3)
-        
-        # Update canvas
-        self.canvas.draw()
+    def update_gain(self, *args):
+        """Apply the current volume to the displayed waveform"""
+        self.waveform.set_gain(self.volume_var.get() / 100.0)
         
     def toggle_play(self):
         """Toggle audio preview playback"""
         if self.playing:
-            pygame.mixer.music.stop()
+            self.sound.stop()
             self.play_button['text'] = "▶ Preview"
             self.playing = False
         else:
             try:
-                # Create a unique temporary file name
-                temp_dir = tempfile.gettempdir()
-                preview_file = os.path.join(temp_dir, f"preview_{id(self)}.wav")
-                
-                # Apply volume adjustment (clamped between 0.0 and 1.0)
-                volume_factor = min(self.volume_var.get() / 100.0, 1.0)
-                
-                if self.volume_var.get() > 100:
-                    # Apply gain for volumes over 100%
-                    gain_db = 20 * np.log10(self.volume_var.get() / 100.0)
-                    preview_audio = self.audio_data.apply_gain(gain_db)
-                    preview_audio.export(preview_file, format="wav")
-                    
-                    # Stop any playing audio before loading new file
-                    pygame.mixer.music.stop()
-                    pygame.mixer.music.unload()
-                    
-                    pygame.mixer.music.load(preview_file)
-                    pygame.mixer.music.set_volume(1.0)  # Full volume since gain is applied
-                else:
-                    # Normal volume playback
-                    pygame.mixer.music.load(self.audio_path)
-                    pygame.mixer.music.set_volume(volume_factor)
-                
-                pygame.mixer.music.play()
+                # Play straight from memory with the volume applied
+                self.sound = play_pcm(self.audio_data, self.volume_var.get() / 100.0)
                 self.play_button['text'] = "⏹ Stop"
                 self.playing = True
                 
-                # Start monitoring thread with temp file reference
-                self.preview_file = preview_file  # Store reference to current preview file
-                threading.Thread(target=lambda: self.monitor_playback(preview_file), 
+                # Start monitoring thread
+                threading.Thread(target=lambda: self.monitor_playback(self.sound), 
                                daemon=True).start()
                 
             except Exception as e:
                 print(f"Playback error: {e}")
                 self.play_button['text'] = "▶ Preview"
                 self.playing = False
-                # Cleanup on error
-                if 'preview_file' in locals() and os.path.exists(preview_file):
-                    try:
-                        os.remove(preview_file)
-                    except:
-                        pass
-
-    def monitor_playback(self, temp_file):
+
+    def monitor_playback(self, sound):
         """Monitor audio playback and update button when finished"""
         try:
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            self.playing = False
-            self.play_button['text'] = "▶ Preview"
-            
-            # Cleanup temp file after playback
-            if os.path.exists(temp_file):
-                try:
-                    pygame.mixer.music.unload()
-                    os.remove(temp_file)
-                except:
-                    pass
+            while is_playing(sound):
+                time.sleep(0.1)
+            if sound is self.sound:
+                self.playing = False
+                self.play_button['text'] = "▶ Preview"
                 
         except Exception as e:
             print(f"Monitor error: {e}")
@@ -180,7 +268,10 @@ class AudioPreviewWidget(ttk.Frame):
         return self.volume_var.get() / 100.0 
 
 class MixerSettingsWindow(tk.Toplevel):
-    def __init__(self, parent, vo_path, bg_path, title="Audio Mixer", vo_volume=100, bg_volume=100):
+    LOAD_POLL_MS = 50
+
+    def __init__(self, parent, vo_path, bg_path, title="Audio Mixer", vo_volume=100, bg_volume=100,
+                 auto_duck=False, ducking=None):
         super().__init__(parent)
         self.title(title)
         self.geometry("800x700")  # Made taller for two waveforms
@@ -190,29 +281,83 @@ class MixerSettingsWindow(tk.Toplevel):
         self.grab_set()
         
         # Initialize audio
-        self.vo_data = None
-        self.bg_data = None
+        self.vo_peaks = None
+        self.bg_peaks = None
+        self.vo_pcm = None
+        self.bg_pcm = None
         self.vo_path = vo_path
         self.bg_path = bg_path
+        self.sound = None
+        self.live_mix = None
+        self.auto_mix = None
         self.playing = False
-        self.pygame_initialized = False
         
         # Save initial volumes
         self.saved_vo_volume = vo_volume
         self.saved_bg_volume = bg_volume
+        self.saved_auto_duck = auto_duck
+        self.saved_ducking = ducking
         
         # Create widgets
         self.create_widgets()
         
-        # Load audio
-        if vo_path:
-            self.vo_data = AudioSegment.from_file(vo_path)
+        # Load audio in the background; the window is usable straight away
+        # and waveforms fill in as the files are scanned
+        self.load_queue = queue.Queue()
+        self.loading = set()
+        if vo_path is not None:
+            self._start_loading('vo', vo_path)
         if bg_path:
-            self.bg_data = AudioSegment.from_file(bg_path)
+            self._start_loading('bg', bg_path)
+        self._poll_loading()
             
-        # Update displays
-        self.update_vo_waveform()
-        self.update_bg_waveform()
+    def _start_loading(self, track, path):
+        self.loading.add(track)
+        threading.Thread(target=self._load_track, args=(track, path), daemon=True).start()
+
+    def _load_track(self, track, path):
+        """Worker thread: open a track and post its peaks as they are computed"""
+        try:
+            audio = open_audio(path)
+            for peaks in PeakPyramid.progressive(audio.samples, audio.frame_rate):
+                self.load_queue.put((track, audio, peaks, peaks.num_samples >= audio.num_frames))
+        except Exception as e:
+            self.load_queue.put((track, None, e, True))
+
+    def _poll_loading(self):
+        """Apply results from the loader threads on the Tk thread"""
+        if not self.winfo_exists():
+            return
+        while True:
+            try:
+                track, audio, peaks, done = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if audio is None:
+                self.loading.discard(track)
+                print(f"Error loading audio: {peaks}")
+                messagebox.showerror("Error", f"Failed to load audio: {str(peaks)}")
+                continue
+            self._apply_loaded(track, audio, peaks, done)
+        if self.loading:
+            self.after(self.LOAD_POLL_MS, self._poll_loading)
+
+    def _apply_loaded(self, track, audio, peaks, done):
+        if track == 'vo':
+            self.vo_peaks = peaks
+            self.vo_waveform.set_peaks(peaks, self.vo_volume.get() / 100.0, audio.duration)
+            if done:
+                self.vo_pcm = audio
+                self.mix_position_slider.config(to=audio.duration)
+        else:
+            self.bg_peaks = peaks
+            self.bg_waveform.set_peaks(peaks, self.bg_volume.get() / 100.0, audio.duration)
+            if done:
+                self.bg_pcm = audio
+        if done:
+            self.loading.discard(track)
+            if not self.loading and self.auto_duck.get():
+                self.apply_auto_mix()
             
     def create_widgets(self):
         # Voiceover section
@@ -220,9 +365,8 @@ class MixerSettingsWindow(tk.Toplevel):
         vo_frame.pack(fill='x', padx=10, pady=5)
         
         # Voiceover waveform
-        self.vo_fig, self.vo_ax = plt.subplots(figsize=(8, 2))
-        self.vo_canvas = FigureCanvasTkAgg(self.vo_fig, master=vo_frame)
-        self.vo_canvas.get_tk_widget().pack(fill='x', expand=True, padx=10, pady=5)
+        self.vo_waveform = WaveformView(vo_frame, on_seek=self.seek_to)
+        self.vo_waveform.pack(fill='x', expand=True, padx=10, pady=5)
         
         # Voiceover volume control
         self.vo_db_label = ttk.Label(vo_frame, text="0 dB", font=("Arial", 12, "bold"))
@@ -246,15 +390,26 @@ class MixerSettingsWindow(tk.Toplevel):
         self.vo_slider.pack(fill='x', padx=10, pady=5)
         
         # Deadspace removal button for voiceover
+        deadspace_frame = ttk.Frame(vo_frame)
+        deadspace_frame.pack(fill='x', padx=10, pady=5)
         self.vo_deadspace_btn = ttk.Button(
-            vo_frame,
+            deadspace_frame,
             text="Remove Deadspace (Experimental)",
             command=self.toggle_deadspace_removal
         )
-        self.vo_deadspace_btn.pack(fill='x', padx=10, pady=5)
+        self.vo_deadspace_btn.pack(side='left', fill='x', expand=True)
+        
+        # VAD aggressiveness; cuts are re-applied from the original audio
+        self.deadspace_mode = tk.IntVar(value=2)
+        mode_box = ttk.Combobox(deadspace_frame, textvariable=self.deadspace_mode,
+                                values=[0, 1, 2, 3], width=3, state='readonly')
+        mode_box.pack(side='right', padx=(5, 0))
+        mode_box.bind('<<ComboboxSelected>>', self.update_deadspace_mode)
+        ttk.Label(deadspace_frame, text="Aggressiveness:").pack(side='right', padx=(10, 0))
         
         # Store original audio for restoration
-        self.original_vo_data = self.vo_data
+        self.original_vo_pcm = None
+        self.original_vo_peaks = None
         self.deadspace_removed = False
         
         # Background Music section
@@ -262,9 +417,8 @@ class MixerSettingsWindow(tk.Toplevel):
         bg_frame.pack(fill='x', padx=10, pady=5)
         
         # Background music waveform
-        self.bg_fig, self.bg_ax = plt.subplots(figsize=(8, 2))
-        self.bg_canvas = FigureCanvasTkAgg(self.bg_fig, master=bg_frame)
-        self.bg_canvas.get_tk_widget().pack(fill='x', expand=True, padx=10, pady=5)
+        self.bg_waveform = WaveformView(bg_frame, on_seek=self.seek_to)
+        self.bg_waveform.pack(fill='x', expand=True, padx=10, pady=5)
         
         # Background music volume control
         self.bg_db_label = ttk.Label(bg_frame, text="0 dB", font=("Arial", 12, "bold"))
@@ -287,6 +441,15 @@ class MixerSettingsWindow(tk.Toplevel):
         )
         self.bg_slider.pack(fill='x', padx=10, pady=5)
         
+        # Automatic mix from loudness analysis and speech ducking
+        self.auto_duck = tk.BooleanVar(value=self.saved_auto_duck)
+        ttk.Checkbutton(
+            self,
+            text="Auto Mix (match loudness and duck music under speech)",
+            variable=self.auto_duck,
+            command=self.toggle_auto_mix
+        ).pack(anchor='w', padx=10, pady=5)
+        
         # Preview controls
         control_frame = ttk.Frame(self)
         control_frame.pack(fill='x', padx=10, pady=5)
@@ -312,6 +475,19 @@ class MixerSettingsWindow(tk.Toplevel):
         )
         self.mix_preview_btn.pack(side='left', padx=5)
         
+        # Mix position, seeks the live mix while it plays
+        self.mix_position = tk.DoubleVar(value=0)
+        self.mix_position_slider = ttk.Scale(
+            control_frame,
+            from_=0,
+            to=1,
+            orient='horizontal',
+            variable=self.mix_position,
+            command=self.seek_mix
+        )
+        self.mix_position_slider.pack(side='left', fill='x', expand=True, padx=5)
+        self.mix_position.trace_add('write', self._update_playheads)
+        
         # Button frame
         button_frame = ttk.Frame(self)
         button_frame.pack(side='bottom', fill='x', padx=10, pady=10)
@@ -328,7 +504,9 @@ class MixerSettingsWindow(tk.Toplevel):
             self.vo_db_label.config(text=f"{db:.1f} dB")
         else:
             self.vo_db_label.config(text="-∞ dB")
-        self.update_vo_waveform()
+        self.vo_waveform.set_gain(volume / 100.0)
+        if self.live_mix is not None:
+            self.live_mix.vo_gain = volume / 100.0
         
     def update_bg_volume(self, *args):
         volume = self.bg_volume.get()
@@ -337,143 +515,160 @@ class MixerSettingsWindow(tk.Toplevel):
             self.bg_db_label.config(text=f"{db:.1f} dB")
         else:
             self.bg_db_label.config(text="-∞ dB")
-        self.update_bg_waveform()
+        self.bg_waveform.set_gain(volume / 100.0)
+        if self.live_mix is not None:
+            self.live_mix.bg_gain = volume / 100.0
 
     def update_vo_waveform(self):
-        self._update_waveform(self.vo_data, self.vo_volume.get(), 
-                            self.vo_ax, self.vo_canvas)
+        self.vo_waveform.set_peaks(self.vo_peaks, self.vo_volume.get() / 100.0)
         
     def update_bg_waveform(self):
-        self._update_waveform(self.bg_data, self.bg_volume.get(), 
-                            self.bg_ax, self.bg_canvas)
-        
-    def _update_waveform(self, audio_data, volume, ax, canvas):
-        if audio_data is None:
-            return
-            
-        ax.clear()
-        samples = np.array(audio_data.get_array_of_samples())
-        volume_factor = volume / 100.0
-        adjusted_samples = samples * volume_factor
-        
-        max_possible = 2**(audio_data.sample_width * 8 - 1)
-        normalized = adjusted_samples / max_possible
-        
-        time = np.linspace(0, len(normalized)/audio_data.frame_rate, len(normalized))
-        ax.plot(time, normalized, linewidth=0.5,
-               color='red' if np.max(np.abs(normalized)) > 1 else 'blue')
-        
-        ax.set_ylim(-1.1, 1.1)
-        ax.set_xlabel('Time (s)')
-        ax.grid(True, alpha=0.3)
-        canvas.draw()
+        self.bg_waveform.set_peaks(self.bg_peaks, self.bg_volume.get() / 100.0)
 
     def preview_voiceover(self):
         """Preview voiceover with current volume"""
         if self.playing:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
+            self.sound.stop()
             self.vo_preview_btn.config(text="Preview Voiceover")
             self.bg_preview_btn.config(state='normal')
             self.mix_preview_btn.config(state='normal')
             self.playing = False
         else:
-            self._preview_audio(self.vo_data, self.vo_volume.get(), self.vo_preview_btn)
+            self._preview_audio(self.vo_pcm, self.vo_volume.get(), self.vo_preview_btn)
             self.bg_preview_btn.config(state='disabled')
             self.mix_preview_btn.config(state='disabled')
         
     def preview_background(self):
         """Preview background music with current volume"""
         if self.playing:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
+            self.sound.stop()
             self.bg_preview_btn.config(text="Preview Music")
             self.vo_preview_btn.config(state='normal')
             self.mix_preview_btn.config(state='normal')
             self.playing = False
         else:
-            self._preview_audio(self.bg_data, self.bg_volume.get(), self.bg_preview_btn)
+            self._preview_audio(self.bg_pcm, self.bg_volume.get(), self.bg_preview_btn)
             self.vo_preview_btn.config(state='disabled')
             self.mix_preview_btn.config(state='disabled')
         
     def preview_mix(self):
-        """Preview both tracks mixed together"""
+        """Preview both tracks mixed together in real time"""
         if self.playing:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
-            self.mix_preview_btn.config(text="Preview Mix")
-            self.vo_preview_btn.config(state='normal')
-            self.bg_preview_btn.config(state='normal')
-            self.playing = False
+            self.live_mix.stop()
+            self._reset_mix_buttons()
             return
         
-        if not self.vo_data or not self.bg_data:
+        if self.vo_pcm is None or self.bg_pcm is None:
             return
         
         try:
-            # Create mix with current volume settings
-            vo_adjusted = self.vo_data.apply_gain(20 * np.log10(self.vo_volume.get() / 100.0))
-            bg_adjusted = self.bg_data.apply_gain(20 * np.log10(self.bg_volume.get() / 100.0))
-            
-            # Mix the tracks
-            mixed = vo_adjusted.overlay(bg_adjusted)
+            # Mixer is rebuilt only when the voiceover itself changes
+            if self.live_mix is None:
+                ducking = self.auto_mix.ducking if self.auto_duck.get() and self.auto_mix else None
+                self.live_mix = LiveMix(MixEngine(self.vo_pcm, self.bg_pcm, ducking=ducking))
+                self.mix_position_slider.config(to=self.live_mix.engine.duration)
             
-            # Export to temp file and play
-            temp_dir = tempfile.gettempdir()
-            preview_file = os.path.join(temp_dir, f"preview_mix_{id(self)}.wav")
-            mixed.export(preview_file, format="wav")
-            
-            if not self.pygame_initialized:
-                pygame.mixer.init()
-                self.pygame_initialized = True
-                
-            pygame.mixer.music.load(preview_file)
-            pygame.mixer.music.play()
+            # Gains are read every block, so sliders apply while playing
+            self.live_mix.vo_gain = self.vo_volume.get() / 100.0
+            self.live_mix.bg_gain = self.bg_volume.get() / 100.0
+            start = self.mix_position.get()
+            if start >= self.live_mix.engine.duration:
+                start = 0.0
+            self.live_mix.start(start)
             
             self.mix_preview_btn.config(text="⏹ Stop Mix")
             self.vo_preview_btn.config(state='disabled')
             self.bg_preview_btn.config(state='disabled')
             self.playing = True
             
-            # Monitor playback
-            threading.Thread(target=lambda: self._monitor_playback(preview_file, 
-                                                                 self.mix_preview_btn,
-                                                                 "Preview Mix"),
-                           daemon=True).start()
+            # Follow playback position
+            self.after(100, self._poll_mix)
                            
         except Exception as e:
             print(f"Mix preview error: {e}")
-            self.mix_preview_btn.config(text="Preview Mix")
-            self.vo_preview_btn.config(state='normal')
-            self.bg_preview_btn.config(state='normal')
-            self.playing = False
+            self._reset_mix_buttons()
+
+    def toggle_auto_mix(self):
+        if self.auto_duck.get():
+            self.apply_auto_mix()
+        elif self.live_mix is not None:
+            self.live_mix.engine.ducking = None
+
+    def apply_auto_mix(self):
+        """Set both gains and the music ducking from one analysis of the tracks"""
+        if self.vo_pcm is None or self.bg_pcm is None:
+            return
+        try:
+            self.auto_mix = AutoMix(self.vo_pcm, self.bg_pcm)
+        except Exception as e:
+            print(f"Auto mix error: {e}")
+            messagebox.showerror("Error", f"Failed to analyze audio: {str(e)}")
+            self.auto_duck.set(False)
+            return
+        
+        self.vo_volume.set(min(max(self.auto_mix.vo_gain * 100, 0.1), 1000))
+        self.bg_volume.set(min(max(self.auto_mix.bg_gain * 100, 0.1), 1000))
+        self.update_vo_volume()
+        self.update_bg_volume()
+        if self.live_mix is not None:
+            self.live_mix.engine.ducking = self.auto_mix.ducking
+
+    def seek_mix(self, *args):
+        """Jump the live mix to the position slider"""
+        if self.live_mix is not None and self.playing:
+            self.live_mix.seek(self.mix_position.get())
+
+    def seek_to(self, seconds):
+        """Seek from a click on either waveform"""
+        self.mix_position.set(seconds)
+        self.seek_mix()
+
+    def _update_playheads(self, *args):
+        position = self.mix_position.get()
+        self.vo_waveform.set_playhead(position)
+        self.bg_waveform.set_playhead(position)
+
+    def _poll_mix(self):
+        if not self.playing or self.live_mix is None:
+            return
+        if self.live_mix.active:
+            self.mix_position.set(self.live_mix.time)
+            self.after(100, self._poll_mix)
+        else:
+            # Reached the end of the mix
+            self.live_mix.stop()
+            self.mix_position.set(0)
+            self._reset_mix_buttons()
+
+    def _reset_live_mix(self):
+        """Drop the live mixer after the voiceover changes"""
+        if self.live_mix is not None:
+            if self.live_mix.active:
+                self.live_mix.stop()
+                self._reset_mix_buttons()
+            self.live_mix = None
+        self.mix_position.set(0)
+
+    def _reset_mix_buttons(self):
+        self.mix_preview_btn.config(text="Preview Mix")
+        self.vo_preview_btn.config(state='normal')
+        self.bg_preview_btn.config(state='normal')
+        self.playing = False
 
-    def _preview_audio(self, audio_data, volume, button):
-        if not audio_data:
+    def _preview_audio(self, audio, volume, button):
+        if audio is None:
             return
         
+        original_text = button.cget('text')
         try:
-            temp_dir = tempfile.gettempdir()
-            preview_file = os.path.join(temp_dir, f"preview_{id(self)}.wav")
+            # Play straight from memory with the gain applied
+            self.sound = play_pcm(audio, volume / 100.0)
             
-            # Apply gain
-            gain_db = 20 * np.log10(volume / 100.0)
-            preview_audio = audio_data.apply_gain(gain_db)
-            preview_audio.export(preview_file, format="wav")
-            
-            if not self.pygame_initialized:
-                pygame.mixer.init()
-                self.pygame_initialized = True
-                
-            pygame.mixer.music.load(preview_file)
-            pygame.mixer.music.play()
-            
-            original_text = button.cget('text')
             button.config(text="⏹ Stop")
             self.playing = True
             
             # Monitor playback
-            threading.Thread(target=lambda: self._monitor_playback(preview_file, 
+            threading.Thread(target=lambda: self._monitor_playback(self.sound, 
                                                                  button,
                                                                  original_text),
                            daemon=True).start()
@@ -483,144 +678,116 @@ class MixerSettingsWindow(tk.Toplevel):
             button.config(text=original_text)
             self.playing = False
 
-    def _monitor_playback(self, temp_file, button, original_text):
+    def _monitor_playback(self, sound, button, original_text):
         try:
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            self.playing = False
-            button.config(text=original_text)
-            
-            if os.path.exists(temp_file):
-                try:
-                    pygame.mixer.music.unload()
-                    os.remove(temp_file)
-                except:
-                    pass
+            while is_playing(sound):
+                time.sleep(0.1)
+            if sound is self.sound:
+                self.playing = False
+                button.config(text=original_text)
                     
         except Exception as e:
             print(f"Monitor error: {e}")
             self.playing = False
             button.config(text=original_text)
 
+    def stop_playback(self):
+        """Stop any preview before the window closes"""
+        if self.live_mix is not None:
+            self.live_mix.stop()
+        if self.sound is not None:
+            self.sound.stop()
+        self.playing = False
+
     def save_changes(self):
         """Save current settings and close window"""
+        self.stop_playback()
+        
         # Save volume settings
         self.saved_vo_volume = self.vo_volume.get()
         self.saved_bg_volume = self.bg_volume.get()
+        self.saved_auto_duck = self.auto_duck.get()
+        if self.saved_auto_duck and self.auto_mix is not None:
+            self.saved_ducking = (audio_identity(self.vo_pcm), self.auto_mix.ducking)
         
         # If deadspace was removed, save the processed audio
         if self.deadspace_removed:
-            # Create a temporary file for the processed audio
-            temp_dir = tempfile.gettempdir()
-            processed_vo_file = os.path.join(temp_dir, f"processed_vo_{id(self)}.wav")
-            self.vo_data.export(processed_vo_file, format="wav")
-            self.vo_path = processed_vo_file  # Update the path to use processed audio
+            # Hand back the processed audio in memory
+            self.vo_path = self.vo_pcm
         
         self.destroy()
 
     def cancel(self):
+        self.stop_playback()
         if self.deadspace_removed:
-            self.vo_data = self.original_vo_data
+            self.vo_pcm = self.original_vo_pcm
         self.vo_volume.set(self.saved_vo_volume)
         self.bg_volume.set(self.saved_bg_volume)
         self.destroy()
         
     def get_volumes(self):
-        """Get saved volume factors and current voiceover path"""
+        """Get saved volume factors, current voiceover (path or processed audio) and auto ducking"""
         return (self.saved_vo_volume / 100.0, 
                 self.saved_bg_volume / 100.0, 
-                self.vo_path)  # Return the current voiceover path
+                self.vo_path,  # Return the current voiceover
+                self.saved_auto_duck)
+
+    def get_ducking(self):
+        """(voiceover identity, music ducking curve) of the saved auto mix, or None"""
+        return self.saved_ducking
 
     def toggle_deadspace_removal(self):
         """Toggle deadspace removal for voiceover"""
+        if self.vo_pcm is None:
+            return
         try:
             if not self.deadspace_removed:
-                # Store original audio if not already stored
-                if self.original_vo_data is None:
-                    self.original_vo_data = self.vo_data
+                # Store original audio for restoration
+                self.original_vo_pcm = self.vo_pcm
+                self.original_vo_peaks = self.vo_peaks
                 
                 # Process audio to remove deadspace while maintaining quality
-                self.vo_data = self.remove_deadspace_hq(self.vo_data)
+                self.vo_pcm = self.remove_deadspace_hq(self.vo_pcm)
+                self.vo_peaks = PeakPyramid(self.vo_pcm.samples, self.vo_pcm.frame_rate)
+                self._reset_live_mix()
                 self.vo_deadspace_btn.config(text="Restore Original Audio")
                 self.deadspace_removed = True
             else:
                 # Restore original audio
-                self.vo_data = self.original_vo_data
+                self.vo_peaks = self.original_vo_peaks
+                self.vo_pcm = self.original_vo_pcm
+                self._reset_live_mix()
                 self.vo_deadspace_btn.config(text="Remove Deadspace (Experimental)")
                 self.deadspace_removed = False
             
             # Update waveform display
             self.update_vo_waveform()
+            if self.auto_duck.get():
+                self.apply_auto_mix()
             
         except Exception as e:
             print(f"Error in deadspace removal: {e}")
             messagebox.showerror("Error", f"Failed to process audio: {str(e)}")
 
-    def remove_deadspace_hq(self, audio):
-        """Remove silence from audio using VAD while maintaining quality"""
-        # Create a working copy for VAD processing by exporting and reimporting
-        temp_file = os.path.join(tempfile.gettempdir(), f"temp_vad_{id(self)}.wav")
+    def update_deadspace_mode(self, *args):
+        """Redo the cut at the new aggressiveness from the original audio"""
+        if not self.deadspace_removed:
+            return
         try:
-            # Create working copy by exporting and reimporting
-            audio.export(temp_file, format="wav")
-            vad_audio = AudioSegment.from_wav(temp_file)
-            
-            # Convert working copy to format needed for VAD
-            if vad_audio.channels > 1:
-                vad_audio = vad_audio.set_channels(1)
-            if vad_audio.sample_width != 2:
-                vad_audio = vad_audio.set_sample_width(2)
-            if vad_audio.frame_rate != 16000:
-                vad_audio = vad_audio.set_frame_rate(16000)
-            
-            # Convert audio to raw data
-            audio_data = np.array(vad_audio.get_array_of_samples())
-            
-            # Initialize VAD
-            vad = webrtcvad.Vad()
-            vad.set_mode(2)  # Aggressiveness level (0-3)
-            
-            # Process in 10ms frames
-            frame_duration = 10  # ms
-            frame_size = int(vad_audio.frame_rate * frame_duration / 1000)
-            num_frames = len(audio_data) // frame_size
-            
-            # Calculate milliseconds per sample for original audio
-            ms_per_sample = 1000 / audio.frame_rate
-            
-            # Identify frames with speech and keep track of timestamps
-            speech_segments = []
-            for i in range(num_frames):
-                frame = audio_data[i*frame_size:(i+1)*frame_size].tobytes()
-                if vad.is_speech(frame, vad_audio.frame_rate):
-                    # Convert frame indices to timestamps for original audio
-                    start_ms = int(i * frame_duration)
-                    end_ms = int((i + 1) * frame_duration)
-                    speech_segments.append((start_ms, end_ms))
-            
-            # Merge consecutive segments
-            merged_segments = []
-            if speech_segments:
-                current_start, current_end = speech_segments[0]
-                for start, end in speech_segments[1:]:
-                    if start <= current_end + 50:  # Add small buffer between segments
-                        current_end = end
-                    else:
-                        merged_segments.append((current_start, current_end))
-                        current_start, current_end = start, end
-                merged_segments.append((current_start, current_end))
-            
-            # Extract segments from original high-quality audio
-            if merged_segments:
-                speech_frames = [audio[start:end] for start, end in merged_segments]
-                return sum(speech_frames[1:], speech_frames[0])
-            
-            return audio
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+            self.vo_pcm = self.remove_deadspace_hq(self.original_vo_pcm)
+            self.vo_peaks = PeakPyramid(self.vo_pcm.samples, self.vo_pcm.frame_rate)
+            self._reset_live_mix()
+            self.update_vo_waveform()
+            if self.auto_duck.get():
+                self.apply_auto_mix()
+        except Exception as e:
+            print(f"Error in deadspace removal: {e}")
+            messagebox.showerror("Error", f"Failed to process audio: {str(e)}")
+
+    def remove_deadspace_hq(self, audio):
+        """Remove silence from in-memory audio using VAD while maintaining quality.
+
+        The result is an EditedAudio whose edit decision list lets cached
+        transcript timings follow the cut.
+        """
+        return remove_deadspace(audio, mode=self.deadspace_mode.get(), merge_gap_ms=50)
@@ -1,61 +1,54 @@
-import asyncio
-import edge_tts
-import ollama
-from pydub import AudioSegment
-from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip, ImageSequenceClip
-import numpy as np
-import webrtcvad
 import shutil
 import os
 import random
+import tempfile
 import cv2
+from audio_engine import (PCMAudio, MixEngine, open_audio, analyze_voiceover, ducking_curve,
+                          audio_identity)
+from footage_library import (FootageLibrary, NORMALIZED_PROFILE, PROXY_PROFILE, list_footage,
+                             concat_stream_copy)
+from subtitles import SubtitleTrack, composite_frame
+from rephrase import rephrase_with_ollama
 
-async def text_to_speech(text, output_file="story_audio.wav"):
-    """Convert text to speech using Edge TTS"""
+async def text_to_speech(text, output_file=None):
+    """Convert text to speech using Edge TTS, decoded in memory"""
+    import edge_tts
     try:
         # Initialize Edge TTS with a voice
         communicate = edge_tts.Communicate(text, "en-US-ChristopherNeural")
         
-        # Generate speech to mp3 first
-        temp_mp3 = "temp_speech.mp3"
-        
         print("Generating speech...")
-        await communicate.save(temp_mp3)
+        # Collect the mp3 stream in memory instead of saving it to disk
+        mp3_data = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                mp3_data.extend(chunk["data"])
         
-        if not os.path.exists(temp_mp3) or os.path.getsize(temp_mp3) == 0:
-            raise Exception("Failed to generate audio file")
+        if not mp3_data:
+            raise Exception("Failed to generate audio stream")
             
-        print("Converting to WAV format...")
-        # Convert to WAV using pydub
-        audio = AudioSegment.from_mp3(temp_mp3)
+        print("Decoding audio...")
+        # Decode once in-process to 16 kHz mono PCM
+        audio = PCMAudio.from_bytes(bytes(mp3_data)).to_mono().resample(16000)
         
         # Ensure audio has content
-        if len(audio) == 0:
+        if audio.num_frames == 0:
             raise Exception("Generated audio has no content")
-            
-        # Export as WAV with specific parameters
-        audio.export(output_file, format="wav", parameters=["-ac", "1", "-ar", "16000"])
         
-        # Verify the output file
-        if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
-            raise Exception("Failed to create WAV file")
-            
-        # Clean up temp file
-        os.remove(temp_mp3)
+        # Only write a file when one was asked for
+        if output_file:
+            audio.write_wav(output_file)
+            print(f"Audio saved to: {output_file}")
         
-        print(f"Audio generated successfully: {output_file}")
-        return output_file
+        print(f"Audio generated successfully ({audio.duration:.1f}s)")
+        return audio
         
     except Exception as e:
         print(f"Error in text_to_speech: {str(e)}")
-        if os.path.exists(temp_mp3):
-            os.remove(temp_mp3)
-        if os.path.exists(output_file):
-            os.remove(output_file)
         raise Exception(f"Failed to generate audio: {str(e)}")
 
 async def process_story(story_text, rephrase=False):
-    """Process input story and convert to audio"""
+    """Process input story and convert to in-memory audio"""
     if rephrase:
         print("Rephrasing story...")
         try:
@@ -71,76 +64,62 @@ async def process_story(story_text, rephrase=False):
         if not story_text or len(story_text.strip()) == 0:
             raise Exception("Empty story text")
             
-        audio_file = await text_to_speech(story_text)
-        if not audio_file or not os.path.exists(audio_file):
-            raise Exception("Failed to generate audio file")
+        audio = await text_to_speech(story_text)
+        if audio is None or audio.num_frames == 0:
+            raise Exception("Failed to generate audio")
             
         # No longer process audio here - let the mixer handle it
         print("Audio generation complete")
-        return audio_file
+        return audio
         
     except Exception as e:
         print(f"Error generating audio: {e}")
         return None
 
-def create_master_track(voiceover_path, music_path, output_path="master_track.wav"):
-    """Combine voiceover and background music"""
-    voiceover_track = AudioSegment.from_file(voiceover_path, format="wav") + 5
-    music_track = AudioSegment.from_file(music_path, format="wav")
-    
-    temp_master_track = voiceover_track.overlay(music_track, position=0)
-    master_track = temp_master_track[:len(voiceover_track)]
+def render_master_track(voiceover, music, vo_gain=1.0, bg_gain=1.0, auto_duck=False, ducking=None):
+    """Mix voiceover and background music in memory with the same mixer the live preview uses.
+
+    With auto_duck the music is ducked under the voiceover's speech.
+    ducking is a (voiceover identity, curve) pair from the mixer's AutoMix;
+    the curve is reused when it was computed for this voiceover, otherwise
+    the voiceover is analyzed again.
+    """
+    voiceover = open_audio(voiceover)
+    engine = MixEngine(voiceover, open_audio(music))
+    if auto_duck:
+        if ducking is not None and ducking[0] == audio_identity(voiceover):
+            engine.ducking = ducking[1]
+        else:
+            _, speech = analyze_voiceover(voiceover)
+            engine.ducking = ducking_curve(speech)
+    return engine.render_all(vo_gain, bg_gain)
+
+def create_master_track(voiceover, music, output_path="master_track.wav", vo_gain=1.0, bg_gain=1.0):
+    """Combine voiceover and background music into a WAV file"""
+    master_track = render_master_track(voiceover, music, vo_gain, bg_gain)
     
-    master_track.export(output_path, format="wav")
+    master_track.write_wav(output_path)
     print(f"Master track saved as '{output_path}'")
 
+def make_audio_clip(audio):
+    """Get a moviepy audio clip from a file path or an in-memory PCMAudio"""
+    from moviepy.editor import AudioFileClip
+    from moviepy.audio.AudioClip import AudioArrayClip
+    if isinstance(audio, PCMAudio):
+        return AudioArrayClip(audio.samples, fps=audio.frame_rate)
+    return AudioFileClip(audio)
+
 def create_video_compilation(video_folder, audio_path, output_path, text_array=None):
     """Create video compilation from folder of clips matched to audio length"""
+    from moviepy.editor import concatenate_videoclips
     print('Creating video compilation')
     
-    # Validate video folder
-    if not os.path.exists(video_folder):
-        raise Exception(f"Video folder '{video_folder}' does not exist")
-    
-    # Get video files
-    video_files = [os.path.join(video_folder, f) for f in os.listdir(video_folder) 
-                  if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))]
-    
-    # Check if any video files were found
-    if not video_files:
-        raise Exception(
-            f"No video files found in '{video_folder}'. "
-            "Please add some video files (MP4, AVI, MOV, or MKV format) to this folder."
-        )
-    
     # Load audio
-    audio = AudioFileClip(audio_path)
+    audio = make_audio_clip(audio_path)
     audio_duration = audio.duration
 
-    # Shuffle video files
-    random.shuffle(video_files)
-
     # Add clips until reaching audio duration
-    video_clips = []
-    current_duration = 0
-    
-    for video_file in video_files:
-        if current_duration >= audio_duration:
-            break
-        try:
-            clip = VideoFileClip(video_file).subclip(0)
-            video_clips.append(clip)
-            current_duration += clip.duration
-        except Exception as e:
-            print(f"Warning: Could not load video file '{video_file}': {str(e)}")
-            continue
-    
-    # Check if we have any valid video clips
-    if not video_clips:
-        raise Exception(
-            "Could not load any valid video clips. "
-            "Please ensure your video files are not corrupted and in a supported format."
-        )
+    video_clips = load_footage_clips(video_folder, audio_duration)
 
     # Create final video
     final_video = concatenate_videoclips(video_clips, method="compose")
@@ -176,83 +155,126 @@ def create_video_compilation(video_folder, audio_path, output_path, text_array=N
     
     print(f"Video compilation saved as '{output_path}'")
 
-def create_subtitled_frames(video_path, text_array, output_folder, FONT, FONT_SCALE_BASE, FONT_THICKNESS, STROKE_THICKNESS):
-    """Create individual frames with subtitles"""
-    print('Extracting frames')
-    cap = cv2.VideoCapture(video_path)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    frame_count = 0
+def list_video_files(video_folder):
+    """List supported video files in a footage folder"""
+    if not os.path.exists(video_folder):
+        raise Exception(f"Video folder '{video_folder}' does not exist")
+    
+    video_files = [os.path.join(video_folder, f) for f in list_footage(video_folder)]
+    if not video_files:
+        raise Exception(
+            f"No video files found in '{video_folder}'. "
+            "Please add some video files (MP4, AVI, MOV, or MKV format) to this folder."
+        )
+    return video_files
 
-    # Calculate the target text height (percentage of screen height)
-    target_height = height * 0.25  # Increased for larger text
+def plan_footage(clips, audio_duration):
+    """Pick shuffled clips from the library index until they cover the audio duration"""
+    clips = list(clips)
+    random.shuffle(clips)
     
-    # Define text area bounds
-    max_width = width * 0.85  # Maximum width for text (85% of screen width)
-    min_width = width * 0.6  # Minimum width for text (60% of screen width)
+    plan = []
+    current_duration = 0
+    for clip in clips:
+        if current_duration >= audio_duration:
+            break
+        plan.append(clip)
+        current_duration += clip.duration
+    return plan
 
-    # Animation settings
-    ANIMATION_FRAMES = 3  # Number of frames for animation
-    last_text = None
-    animation_start = 0
-    current_scale = FONT_SCALE_BASE * 2  # Base scale for current text
+def plan_library_footage(video_folder, audio_duration):
+    """Refresh the footage library index and plan clips covering the audio duration"""
+    list_video_files(video_folder)
+    library = FootageLibrary(video_folder)
+    library.refresh()
+    return library, plan_footage(library.clips(), audio_duration)
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+def open_footage_clips(library, plan, draft=False):
+    """Open planned clips, decoding proxies for drafts and normalised intermediates where they exist"""
+    from moviepy.editor import VideoFileClip
+    video_clips = []
+    for clip_info in plan:
+        cached = library.proxy(clip_info) if draft else library.normalized(clip_info)
+        path = cached or clip_info.path
+        try:
+            clip = VideoFileClip(path).subclip(0)
+            video_clips.append(clip)
+        except Exception as e:
+            print(f"Warning: Could not load video file '{clip_info.path}': {str(e)}")
+            continue
+    
+    # Check if we have any valid video clips
+    if not video_clips:
+        raise Exception(
+            "Could not load any valid video clips. "
+            "Please ensure your video files are not corrupted and in a supported format."
+        )
+    return video_clips
 
-        # Find current text
-        current_text = None
-        for text_item in text_array:
-            if frame_count >= text_item[1] and frame_count <= text_item[2]:
-                if text_item[0] != last_text:
-                    animation_start = frame_count
-                    current_scale = FONT_SCALE_BASE  # Start small
-                current_text = text_item[0]
-                last_text = current_text
-                break
-        
-        # If no text found, use last text
-        if not current_text and last_text:
-            current_text = last_text
+def load_footage_clips(video_folder, audio_duration):
+    """Load shuffled clips until they cover the audio duration.
 
-        if current_text:
-            # Handle long single words
-            if len(current_text.split()) == 1 and len(current_text) > 15:
-                current_text = current_text[:15] + "..."
+    Durations come from the footage library index, so only the clips
+    that will be used are opened.
+    """
+    return open_footage_clips(*plan_library_footage(video_folder, audio_duration))
 
-            # Calculate animation progress
-            if frame_count < animation_start + ANIMATION_FRAMES:
-                progress = (frame_count - animation_start) / ANIMATION_FRAMES
-                font_scale = FONT_SCALE_BASE + (FONT_SCALE_BASE * 2 - FONT_SCALE_BASE) * progress
-            else:
-                font_scale = FONT_SCALE_BASE * 2
+def subtitle_scale(draft=False):
+    """Subtitle size relative to the output for footage rendered by prepare_footage"""
+    if draft:
+        return PROXY_PROFILE["height"] / NORMALIZED_PROFILE["height"]
+    return 1.0
 
-            # Get text size
-            text_size, _ = cv2.getTextSize(current_text, FONT, font_scale, FONT_THICKNESS)
-            
-            # Adjust font size to fit width and height
-            safety_margin = 20
-            while (text_size[0] > max_width - safety_margin or 
-                   text_size[1] > target_height - safety_margin):
-                font_scale *= 0.98
-                text_size, _ = cv2.getTextSize(current_text, FONT, font_scale, FONT_THICKNESS)
+def prepare_footage(video_folder, audio_duration, output_path=None, fps=60, draft=False):
+    """Render the background footage for a given duration, without audio or subtitles.
 
-            # Calculate position for center of screen
-            text_x = int((width - text_size[0]) / 2)
-            text_y = int(height / 2 + text_size[1] / 3)  # Slightly above center
+    Nothing here depends on the transcript, so it can run in a background
+    thread while transcription and transcript editing are in progress.
+    When every planned clip has a normalised intermediate at this frame
+    rate, they are joined by stream copy instead of being re-encoded.
+    Draft footage is built from the low-resolution proxies the same way.
+    Returns the path of the rendered footage.
+    """
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(prefix="footage_", suffix=".mp4")
+        os.close(fd)
+    
+    print('Preparing footage')
+    library, plan = plan_library_footage(video_folder, audio_duration)
+    if draft:
+        cached, profile = [library.proxy(clip_info) for clip_info in plan], PROXY_PROFILE
+    else:
+        cached, profile = [library.normalized(clip_info) for clip_info in plan], NORMALIZED_PROFILE
+    if plan and fps == profile["fps"] and all(cached):
+        concat_stream_copy(cached, audio_duration, output_path)
+        print(f"Footage ready (stream copy): {output_path}")
+        return output_path
+    
+    from moviepy.editor import concatenate_videoclips
+    video_clips = open_footage_clips(library, plan, draft)
+    footage = concatenate_videoclips(video_clips, method="compose")
+    footage = footage.subclip(0, min(audio_duration, footage.duration))
+    footage.write_videofile(output_path, codec="libx264", fps=fps, audio=False, logger=None)
+    
+    for clip in video_clips:
+        clip.close()
+    print(f"Footage ready: {output_path}")
+    return output_path
 
-            # Draw black stroke/outline (draw text in 8 directions)
-            for dx, dy in [(-1,-1), (-1,1), (1,-1), (1,1), (0,1), (0,-1), (1,0), (-1,0)]:
-                cv2.putText(frame, current_text, 
-                          (text_x + dx*STROKE_THICKNESS//3, text_y + dy*STROKE_THICKNESS//3), 
-                          FONT, font_scale, (0, 0, 0), STROKE_THICKNESS)
-            
-            # Draw white text
-            cv2.putText(frame, current_text, (text_x, text_y), FONT, font_scale,
-                       (255, 255, 255), FONT_THICKNESS)
+def create_subtitled_frames(video_path, text_array, output_folder, FONT, FONT_SCALE_BASE, FONT_THICKNESS, STROKE_THICKNESS):
+    """Create individual frames with subtitles"""
+    print('Extracting frames')
+    cap = cv2.VideoCapture(video_path)
+    frame_count = 0
+    track = SubtitleTrack(text_array)
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
 
+        composite_frame(frame, track, frame_count, font=FONT, font_scale_base=FONT_SCALE_BASE,
+                        font_thickness=FONT_THICKNESS, stroke_thickness=STROKE_THICKNESS)
         cv2.imwrite(os.path.join(output_folder, f"{frame_count}.jpg"), frame)
         frame_count += 1
 
@@ -261,12 +283,13 @@ def create_subtitled_frames(video_path, text_array, output_folder, FONT, FONT_SC
 
 def create_final_video(frames_folder, fps, audio_path, output_path):
     """Compile frames into final video with audio"""
+    from moviepy.editor import ImageSequenceClip
     print('Creating video')
     images = sorted([img for img in os.listdir(frames_folder) if img.endswith(".jpg")],
                    key=lambda x: int(x.split(".")[0]))
     
     clip = ImageSequenceClip([os.path.join(frames_folder, image) for image in images], fps=fps)
-    audio = AudioFileClip(audio_path)
+    audio = make_audio_clip(audio_path)
     clip = clip.set_audio(audio)
     clip.write_videofile(output_path)
 
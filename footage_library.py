@@ -0,0 +1,427 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import cv2
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# Managed files live in a hidden folder inside the footage folder
+LIBRARY_DIR = ".library"
+INDEX_NAME = "index.sqlite3"
+
+# Bytes hashed from the start, middle and end of each file
+HASH_SAMPLE_BYTES = 1024 * 1024
+
+# Canonical intermediate every clip is normalised to, matching the render
+# output: vertical 1080x1920 at 60 fps, H.264 with a one-second GOP
+NORMALIZED_PROFILE = {
+    "width": 1080,
+    "height": 1920,
+    "fps": 60,
+    "codec": "libx264",
+    "preset": "veryfast",
+    "crf": 18,
+    "gop": 60,
+    "pix_fmt": "yuv420p",
+}
+NORMALIZED_DIR = "normalized"
+
+# Low-resolution, low-bitrate proxies for browsing and draft renders. They
+# keep the output frame rate so subtitle timings and stream copies still work.
+PROXY_PROFILE = {
+    "width": 270,
+    "height": 480,
+    "fps": 60,
+    "codec": "libx264",
+    "preset": "veryfast",
+    "crf": 32,
+    "gop": 60,
+    "pix_fmt": "yuv420p",
+}
+PROXY_DIR = "proxies"
+
+# Poster frames, taken this far into each clip
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_HEIGHT = 96
+POSTER_POSITION = 0.1
+
+ClipInfo = namedtuple("ClipInfo", ["path", "duration", "width", "height", "fps",
+                                   "codec", "keyframes", "hash"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    codec TEXT,
+    keyframes INTEGER,
+    hash TEXT,
+    error TEXT
+)
+"""
+
+def list_footage(video_folder):
+    """Names of the supported video files in a footage folder"""
+    return sorted(f for f in os.listdir(video_folder)
+                  if f.lower().endswith(VIDEO_EXTENSIONS) and not f.startswith('.'))
+
+def file_hash(path, size):
+    """Content hash from samples at the start, middle and end of a file.
+
+    Hashing every byte of a large library would cost as much as reading it;
+    the samples plus the size tell copies and re-encodes apart.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as video_file:
+        for offset in sorted({0, max(size // 2 - HASH_SAMPLE_BYTES // 2, 0),
+                              max(size - HASH_SAMPLE_BYTES, 0)}):
+            video_file.seek(offset)
+            digest.update(video_file.read(HASH_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+def _rate(value):
+    """Frame rate from an ffprobe fraction such as '30000/1001'"""
+    numerator, _, denominator = (value or "0/1").partition('/')
+    denominator = float(denominator or 1)
+    return float(numerator) / denominator if denominator else 0.0
+
+def probe_video(path):
+    """Duration, resolution, fps, codec and keyframe count of a video file.
+
+    Uses ffprobe, which only demuxes the file, and falls back to OpenCV
+    (without a keyframe count) when ffprobe is not installed.
+    """
+    if shutil.which("ffprobe") is None:
+        return _probe_with_opencv(path)
+
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "stream=codec_name,width,height,avg_frame_rate,r_frame_rate"
+                          ":format=duration:packet=flags",
+         "-of", "json", path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    info = json.loads(output)
+    if not info.get("streams"):
+        raise ValueError("no video stream")
+    stream = info["streams"][0]
+    return {
+        "duration": float(info["format"]["duration"]),
+        "width": stream["width"],
+        "height": stream["height"],
+        "fps": _rate(stream.get("avg_frame_rate")) or _rate(stream.get("r_frame_rate")),
+        "codec": stream["codec_name"],
+        "keyframes": sum('K' in packet.get("flags", "") for packet in info.get("packets", [])),
+    }
+
+def _probe_with_opencv(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError("could not open video")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            "duration": frames / fps if fps else 0.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": fps,
+            "codec": "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip().lower(),
+            "keyframes": None,
+        }
+    finally:
+        cap.release()
+
+def ffmpeg_binary():
+    """ffmpeg on the PATH, else the copy bundled with moviepy's imageio-ffmpeg"""
+    binary = shutil.which("ffmpeg")
+    if binary is None:
+        import imageio_ffmpeg
+        binary = imageio_ffmpeg.get_ffmpeg_exe()
+    return binary
+
+def profile_id(profile):
+    """Short stable id of an encoding profile, part of cached file names"""
+    return hashlib.blake2b(json.dumps(profile, sort_keys=True).encode(), digest_size=4).hexdigest()
+
+def _write_atomically(output_path, extension, command):
+    """Run an ffmpeg command writing to a unique temporary file, then rename it into place.
+
+    Concurrent builds of the same output each write their own file, so the
+    last one to finish wins and none is ever left half written.
+    """
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(output_path),
+                                   prefix=os.path.basename(output_path) + ".",
+                                   suffix=".part" + extension)
+    os.close(fd)
+    try:
+        subprocess.run(command + [partial], capture_output=True, text=True, check=True)
+        os.replace(partial, output_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return output_path
+
+def normalize_clip(source, output_path, profile=NORMALIZED_PROFILE):
+    """Transcode a clip to the canonical intermediate, without audio.
+
+    The frame is scaled to cover the target size and centre-cropped, and
+    keyframes are forced every GOP so cuts and stream copies stay exact.
+    The file is written under a temporary name and renamed when complete.
+    """
+    width, height = profile["width"], profile["height"]
+    return _write_atomically(output_path, ".mp4", [
+        ffmpeg_binary(), "-y", "-v", "error", "-i", source, "-an",
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+               f"crop={width}:{height},fps={profile['fps']},setsar=1",
+        "-c:v", profile["codec"], "-preset", profile["preset"], "-crf", str(profile["crf"]),
+        "-g", str(profile["gop"]), "-keyint_min", str(profile["gop"]), "-sc_threshold", "0",
+        "-pix_fmt", profile["pix_fmt"], "-movflags", "+faststart"
+    ])
+
+def make_thumbnail(source, output_path, seconds, height=THUMBNAIL_HEIGHT):
+    """Save the frame at seconds as a PNG poster, height pixels tall"""
+    return _write_atomically(output_path, ".png", [
+        ffmpeg_binary(), "-y", "-v", "error", "-ss", f"{seconds:.3f}", "-i", source,
+        "-frames:v", "1", "-vf", f"scale=-2:{height}"
+    ])
+
+def build_preview(source, proxy_path, thumbnail_path, poster_time):
+    """Build whichever of a clip's proxy and poster are missing"""
+    if not os.path.exists(thumbnail_path):
+        make_thumbnail(source, thumbnail_path, poster_time)
+    if not os.path.exists(proxy_path):
+        normalize_clip(source, proxy_path, PROXY_PROFILE)
+
+def _prune(folder, wanted):
+    """Delete files in a managed folder that no indexed clip uses any more"""
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        # Files still being written by another build are left alone
+        if path not in wanted and ".part." not in name:
+            os.remove(path)
+
+# One lock per library folder, shared by every FootageLibrary opened on it
+_library_locks = {}
+_library_locks_guard = threading.Lock()
+
+def _library_lock(video_folder):
+    with _library_locks_guard:
+        return _library_locks.setdefault(os.path.abspath(video_folder), threading.RLock())
+
+def concat_stream_copy(paths, duration, output_path):
+    """Join clips that share one encoding into output_path without re-encoding"""
+    list_path = output_path + ".txt"
+    with open(list_path, 'w', encoding='utf-8') as list_file:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(
+            [ffmpeg_binary(), "-y", "-v", "error", "-f", "concat", "-safe", "0",
+             "-i", list_path, "-c", "copy", "-t", f"{duration:.3f}", output_path],
+            capture_output=True, text=True, check=True
+        )
+    finally:
+        os.remove(list_path)
+    return output_path
+
+def _probe_entry(path, stat):
+    """Probe one file for the index; failures are recorded instead of raised"""
+    try:
+        metadata = probe_video(path)
+        metadata["hash"] = file_hash(path, stat.st_size)
+        metadata["error"] = None
+    except Exception as e:
+        metadata = {"error": str(e) or type(e).__name__}
+    return metadata
+
+class FootageLibrary:
+    """Persistent index of a footage folder.
+
+    Probe metadata is stored in an SQLite database under LIBRARY_DIR and
+    trusted while a file's mtime and size are unchanged, so planning a
+    render is a query instead of one ffmpeg probe per file. refresh()
+    probes only new or changed files, in parallel, and forgets removed ones.
+    """
+    def __init__(self, video_folder):
+        if not os.path.exists(video_folder):
+            raise Exception(f"Video folder '{video_folder}' does not exist")
+        self.video_folder = video_folder
+        # Index updates and pruning are serialised, so a prune always sees
+        # the clips another thread has just indexed and built files for
+        self.lock = _library_lock(video_folder)
+        self.db_path = self.managed_path(INDEX_NAME)
+        with self._connect() as db:
+            db.execute(SCHEMA)
+
+    def managed_path(self, *parts):
+        """Path inside the library's managed folder, creating its directory"""
+        path = os.path.join(self.video_folder, LIBRARY_DIR, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _connect(self):
+        # One connection per call keeps the index usable from any thread
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def refresh(self, workers=None, progress=None):
+        """Bring the index up to date with the folder.
+
+        Returns (probed, removed) counts. progress, if given, is called
+        with (done, total) as probes finish.
+        """
+        with self.lock:
+            return self._refresh(workers, progress)
+
+    def _refresh(self, workers, progress):
+        names = list_footage(self.video_folder)
+        with self._connect() as db:
+            known = {name: (mtime_ns, size) for name, mtime_ns, size in
+                     db.execute("SELECT name, mtime_ns, size FROM clips")}
+
+        stats = {name: os.stat(os.path.join(self.video_folder, name)) for name in names}
+        stale = [name for name in names
+                 if known.get(name) != (stats[name].st_mtime_ns, stats[name].st_size)]
+        removed = [name for name in known if name not in stats]
+
+        rows = []
+        if stale:
+            # Probing waits on ffprobe subprocesses and disk, so threads are enough
+            workers = workers or min(32, (os.cpu_count() or 1) * 2)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_probe_entry, os.path.join(self.video_folder, name),
+                                           stats[name]): name for name in stale}
+                for done, future in enumerate(as_completed(futures), 1):
+                    name = futures[future]
+                    metadata = future.result()
+                    rows.append((name, stats[name].st_mtime_ns, stats[name].st_size,
+                                 metadata.get("duration"), metadata.get("width"),
+                                 metadata.get("height"), metadata.get("fps"),
+                                 metadata.get("codec"), metadata.get("keyframes"),
+                                 metadata.get("hash"), metadata["error"]))
+                    if progress is not None:
+                        progress(done, len(stale))
+
+        with self._connect() as db:
+            db.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            db.executemany("DELETE FROM clips WHERE name = ?", [(name,) for name in removed])
+        return len(stale), len(removed)
+
+    def clips(self, min_duration=0.0):
+        """Usable clips in the index, longest first"""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT name, duration, width, height, fps, codec, keyframes, hash FROM clips "
+                "WHERE error IS NULL AND duration > ? ORDER BY duration DESC",
+                (min_duration,)
+            ).fetchall()
+        return [ClipInfo(os.path.join(self.video_folder, row[0]), *row[1:]) for row in rows]
+
+    def _prune_unused(self, folder, path_of):
+        """Delete files in a managed folder that no clip in the current index uses"""
+        with self.lock:
+            _prune(self.managed_path(folder, ""), {path_of(clip) for clip in self.clips()})
+
+    def normalized_path(self, clip, profile=NORMALIZED_PROFILE):
+        """Cache path of a clip's canonical intermediate, whether built or not"""
+        return self.managed_path(NORMALIZED_DIR, f"{clip.hash}_{profile_id(profile)}.mp4")
+
+    def normalized(self, clip, profile=NORMALIZED_PROFILE):
+        """Path of the clip's intermediate if it has been built, else None"""
+        path = self.normalized_path(clip, profile)
+        return path if os.path.exists(path) else None
+
+    def normalize(self, workers=1, profile=NORMALIZED_PROFILE, progress=None):
+        """Build missing intermediates for every indexed clip and drop unused ones.
+
+        Each ffmpeg process is itself multi-threaded, so few workers are
+        needed. Returns the number of clips transcoded; failures are
+        reported and retried on the next call.
+        """
+        clips = self.clips()
+        wanted = {self.normalized_path(clip, profile): clip for clip in clips}
+        missing = [(path, clip) for path, clip in wanted.items() if not os.path.exists(path)]
+
+        # Forget intermediates of removed or changed clips and of old profiles
+        self._prune_unused(NORMALIZED_DIR, lambda clip: self.normalized_path(clip, profile))
+
+        built = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(normalize_clip, clip.path, path, profile): clip
+                       for path, clip in missing}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    future.result()
+                    built += 1
+                except Exception as e:
+                    print(f"Warning: Could not normalise '{futures[future].path}': {e}")
+                if progress is not None:
+                    progress(done, len(missing))
+        return built
+
+    def proxy_path(self, clip):
+        return self.managed_path(PROXY_DIR, f"{clip.hash}_{profile_id(PROXY_PROFILE)}.mp4")
+
+    def proxy(self, clip):
+        """Path of the clip's low-resolution proxy if it has been built, else None"""
+        path = self.proxy_path(clip)
+        return path if os.path.exists(path) else None
+
+    def thumbnail_path(self, clip):
+        return self.managed_path(THUMBNAIL_DIR, f"{clip.hash}_{THUMBNAIL_HEIGHT}.png")
+
+    def thumbnail(self, clip):
+        """Path of the clip's poster frame if it has been built, else None"""
+        path = self.thumbnail_path(clip)
+        return path if os.path.exists(path) else None
+
+    def build_previews(self, workers=None, progress=None):
+        """Build missing proxies and poster frames and drop unused ones.
+
+        Each task only waits on an ffmpeg process, so a thread pool is
+        enough and keeps fork out of the multi-threaded GUI process.
+        Returns the number of clips updated; failures are reported and
+        retried on the next call.
+        """
+        self._prune_unused(PROXY_DIR, self.proxy_path)
+        self._prune_unused(THUMBNAIL_DIR, self.thumbnail_path)
+
+        clips = self.clips()
+        missing = [clip for clip in clips if self.proxy(clip) is None or self.thumbnail(clip) is None]
+        if not missing:
+            return 0
+
+        built = 0
+        workers = workers or max(1, (os.cpu_count() or 1) // 2)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(build_preview, clip.path, self.proxy_path(clip),
+                                       self.thumbnail_path(clip), clip.duration * POSTER_POSITION): clip
+                       for clip in missing}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    future.result()
+                    built += 1
+                except Exception as e:
+                    print(f"Warning: Could not build preview of '{futures[future].path}': {e}")
+                if progress is not None:
+                    progress(done, len(missing))
+        return built
+
+    def errors(self):
+        """(path, error) of files that could not be probed"""
+        with self._connect() as db:
+            rows = db.execute("SELECT name, error FROM clips WHERE error IS NOT NULL").fetchall()
+        return [(os.path.join(self.video_folder, name), error) for name, error in rows]
@@ -0,0 +1,261 @@
+import os
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+import cv2
+from footage_library import FootageLibrary, THUMBNAIL_HEIGHT
+from subtitles import SubtitleTrack, composite_frame, read_frame
+
+def frame_to_photo(frame):
+    """Tk PhotoImage from a BGR OpenCV frame, passed as a binary PPM"""
+    height, width = frame.shape[:2]
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return tk.PhotoImage(data=f"P6 {width} {height} 255 ".encode() + rgb.tobytes())
+
+class FootageBrowser(tk.Toplevel):
+    """Browse the footage library from its index, poster frames and proxies.
+
+    Nothing here opens the full-resolution clips: the list is an index
+    query, each row shows the clip's poster frame, and previews play the
+    low-resolution proxy. Missing previews are built in the background and
+    filled in when ready.
+    """
+    POLL_MS = 200
+
+    def __init__(self, parent, video_folder, title="Footage Library"):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("900x650")
+        self.transient(parent)
+
+        self.library = FootageLibrary(video_folder)
+        self.clips = {}
+        self.thumbnails = {}
+        self.capture = None
+        self.playing_path = None
+        self.preview_job = None
+        self.preview_image = None
+        self.updates = queue.Queue()
+
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.load_clips()
+
+        # Probe new files and build missing previews without blocking the window
+        self.worker = threading.Thread(target=self._update_library, daemon=True)
+        self.worker.start()
+        self.after(self.POLL_MS, self._poll_updates)
+
+    def create_widgets(self):
+        # Clip list with poster frames
+        list_frame = ttk.Frame(self)
+        list_frame.pack(side='left', fill='both', expand=True, padx=10, pady=10)
+
+        style = ttk.Style(self)
+        style.configure("Footage.Treeview", rowheight=THUMBNAIL_HEIGHT + 4)
+        columns = ("duration", "resolution", "fps", "codec")
+        self.tree = ttk.Treeview(list_frame, columns=columns, style="Footage.Treeview")
+        self.tree.heading("#0", text="Clip")
+        self.tree.column("#0", width=260)
+        for column, width in zip(columns, (70, 90, 50, 60)):
+            self.tree.heading(column, text=column.title())
+            self.tree.column(column, width=width, anchor='center')
+        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        self.tree.bind('<<TreeviewSelect>>', lambda event: self.play_selected())
+
+        # Proxy preview
+        preview_frame = ttk.LabelFrame(self, text="Preview")
+        preview_frame.pack(side='right', fill='y', padx=10, pady=10)
+        self.preview_label = ttk.Label(preview_frame, text="Select a clip", anchor='center')
+        self.preview_label.pack(padx=10, pady=10)
+        self.status_var = tk.StringVar()
+        ttk.Label(preview_frame, textvariable=self.status_var).pack(padx=10, pady=5)
+        ttk.Button(preview_frame, text="Close", command=self.close).pack(side='bottom', pady=10)
+
+    def load_clips(self):
+        """Fill the list from the index"""
+        self.tree.delete(*self.tree.get_children())
+        self.clips = {}
+        clips = sorted(self.library.clips(), key=lambda clip: os.path.basename(clip.path).lower())
+        for clip in clips:
+            item = self.tree.insert('', 'end', text=os.path.basename(clip.path),
+                                    image=self._thumbnail(clip),
+                                    values=(f"{clip.duration:.1f}s", f"{clip.width}x{clip.height}",
+                                            f"{clip.fps:.0f}", clip.codec))
+            self.clips[item] = clip
+        missing = sum(self.library.proxy(clip) is None for clip in clips)
+        self.status_var.set(f"{len(clips)} clips" + (f", {missing} previews pending" if missing else ""))
+
+        # Keep the selection across reloads
+        for item, clip in self.clips.items():
+            if clip.path == self.playing_path:
+                self.tree.selection_set(item)
+
+    def _thumbnail(self, clip):
+        path = self.library.thumbnail(clip)
+        if path is None:
+            return ''
+        if path not in self.thumbnails:
+            self.thumbnails[path] = tk.PhotoImage(file=path)
+        return self.thumbnails[path]
+
+    def _update_library(self):
+        """Worker thread: refresh the index, then build previews"""
+        try:
+            self.library.refresh()
+            self.updates.put(None)
+            self.library.build_previews()
+            self.updates.put(None)
+        except Exception as e:
+            self.updates.put(e)
+
+    def _poll_updates(self):
+        if not self.winfo_exists():
+            return
+        try:
+            while True:
+                update = self.updates.get_nowait()
+                if isinstance(update, Exception):
+                    messagebox.showerror("Error", f"Failed to update footage library: {update}")
+                else:
+                    self.load_clips()
+        except queue.Empty:
+            pass
+        if self.worker.is_alive() or not self.updates.empty():
+            self.after(self.POLL_MS, self._poll_updates)
+
+    def play_selected(self):
+        """Loop the selected clip's proxy in the preview"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        clip = self.clips[selection[0]]
+        if clip.path == self.playing_path and self.capture is not None:
+            return
+        proxy = self.library.proxy(clip)
+        self.stop_preview()
+        if proxy is None:
+            self.preview_label.config(image='', text="Preview not built yet")
+            return
+        self.capture = cv2.VideoCapture(proxy)
+        self.playing_path = clip.path
+        fps = self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_delay = max(1, int(1000 / fps))
+        self._show_frame()
+
+    def _show_frame(self):
+        ret, frame = self.capture.read()
+        if not ret:
+            # Loop the clip
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+            if not ret:
+                self.stop_preview()
+                return
+        self.preview_image = frame_to_photo(frame)
+        self.preview_label.config(image=self.preview_image, text='')
+        self.preview_job = self.after(self.frame_delay, self._show_frame)
+
+    def stop_preview(self):
+        if self.preview_job is not None:
+            self.after_cancel(self.preview_job)
+            self.preview_job = None
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def close(self):
+        self.stop_preview()
+        self.destroy()
+
+class SubtitlePreview(tk.Toplevel):
+    """Scrub prepared footage and see any single frame with its subtitle.
+
+    Only the frame under the slider is decoded, by seeking, and it is
+    composited with the same code as the final render, so each position
+    costs one decode instead of a render of the whole timeline.
+    """
+    PREVIEW_HEIGHT = 640
+
+    def __init__(self, parent, footage_path, text_array, scale=1.0, title="Subtitle Preview"):
+        super().__init__(parent)
+        self.title(title)
+        self.transient(parent)
+
+        self.capture = cv2.VideoCapture(footage_path)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 60
+        self.frame_count = max(int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)), 1)
+        self.track = SubtitleTrack(text_array)
+        self.scale = scale
+        self.position = tk.DoubleVar(value=0)
+        self.shown_frame = None
+        self.preview_image = None
+        self.pending = None
+
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.bind('<Left>', lambda event: self.step(-1))
+        self.bind('<Right>', lambda event: self.step(1))
+        self.request_frame()
+
+    def create_widgets(self):
+        self.preview_label = ttk.Label(self, anchor='center')
+        self.preview_label.pack(padx=10, pady=10)
+
+        controls = ttk.Frame(self)
+        controls.pack(fill='x', padx=10, pady=5)
+        ttk.Button(controls, text="<", width=3, command=lambda: self.step(-1)).pack(side='left')
+        ttk.Scale(controls, from_=0, to=self.frame_count - 1, orient='horizontal',
+                  variable=self.position,
+                  command=lambda value: self.request_frame()).pack(side='left', fill='x', expand=True, padx=5)
+        ttk.Button(controls, text=">", width=3, command=lambda: self.step(1)).pack(side='left')
+
+        self.status_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.status_var).pack(padx=10)
+        ttk.Button(self, text="Close", command=self.close).pack(pady=10)
+
+    def step(self, frames):
+        self.position.set(min(max(self.current_frame() + frames, 0), self.frame_count - 1))
+        self.request_frame()
+
+    def current_frame(self):
+        return int(round(self.position.get()))
+
+    def request_frame(self):
+        """Show the frame under the slider once pending drag events are handled"""
+        if self.pending is None:
+            self.pending = self.after_idle(self._show_frame)
+
+    def _show_frame(self):
+        self.pending = None
+        index = self.current_frame()
+        if index == self.shown_frame:
+            return
+        frame = read_frame(self.capture, index)
+        if frame is None:
+            return
+        composite_frame(frame, self.track, index, scale=self.scale)
+
+        # Composite at full resolution so the text matches the render, then scale down
+        height, width = frame.shape[:2]
+        if height > self.PREVIEW_HEIGHT:
+            size = (int(width * self.PREVIEW_HEIGHT / height), self.PREVIEW_HEIGHT)
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        self.preview_image = frame_to_photo(frame)
+        self.preview_label.config(image=self.preview_image)
+        self.shown_frame = index
+
+        text, _ = self.track.cue_at(index)
+        self.status_var.set(f"{index / self.fps:.2f}s  frame {index}/{self.frame_count - 1}"
+                            + (f"  \"{text}\"" if text else ""))
+
+    def close(self):
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+            self.pending = None
+        self.capture.release()
+        self.destroy()
@@ -2,18 +2,20 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import asyncio
 import os
-from backend_processing import (process_story, create_master_track, 
-                              create_video_compilation, process_segment_with_words)
-import whisper
-import threading
-import random
+import queue
+from backend_processing import (process_story, render_master_track, prepare_footage,
+                              make_audio_clip, process_segment_with_words, subtitle_scale)
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import shutil
-from moviepy.editor import AudioFileClip, VideoFileClip, concatenate_videoclips, ImageSequenceClip
-from audio_widgets import AudioPreviewWidget, MixerSettingsWindow
-from pydub import AudioSegment
-import numpy as np
-import ollama
+from audio_widgets import MixerSettingsWindow
+from footage_widgets import FootageBrowser, SubtitlePreview
+from subtitles import SubtitleTrack, composite_frame
+from rephrase import RephraseJob
+from audio_engine import open_audio, whisper_input, unwrap_edits, audio_identity
+from transcription import (load_model, transcribe_parallel, align_script, remap_result, MODEL_SIZES,
+                           TRANSCRIPTION_MODEL, ALIGNMENT_MODEL)
 
 class VideoGeneratorGUI:
     def __init__(self, root):
@@ -27,13 +29,31 @@ class VideoGeneratorGUI:
         self.bg_music_story = tk.StringVar(value="bg_music.wav")
         self.bg_music_vo = tk.StringVar(value="bg_music.wav")
         self.voiceover_path = tk.StringVar()
+        self.script_path = tk.StringVar()
+        self.processed_voiceover = None
+        # Last transcription: (source audio identity, settings, result)
+        self.transcript_cache = None
+        self.align_story_script = tk.BooleanVar(value=True)
         self.video_folder_story = tk.StringVar(value="Background_Footage")
         self.video_folder_vo = tk.StringVar(value="Background_Footage")
+        self.draft_render = tk.BooleanVar(value=False)
+        
+        # Initialize transcription settings
+        self.whisper_model = tk.StringVar(value=TRANSCRIPTION_MODEL)
+        self.whisper_int8 = tk.BooleanVar(value=False)
+        self.whisper_threads = tk.IntVar(value=os.cpu_count() or 1)
+        self.whisper_workers = tk.IntVar(value=min(4, os.cpu_count() or 1))
         
         # Initialize volume settings
-        self.vo_volume = 100
+        self.vo_volume_story = 100
+        self.vo_volume_vo = 100
         self.bg_volume_story = 100
         self.bg_volume_vo = 100
+        self.auto_duck_story = False
+        self.auto_duck_vo = False
+        # (voiceover identity, music ducking curve) from each tab's last auto mix
+        self.ducking_story = None
+        self.ducking_vo = None
         
         # Create main notebook for tabs
         self.notebook = ttk.Notebook(root)
@@ -49,6 +69,9 @@ class VideoGeneratorGUI:
         self.setup_story_tab()
         self.setup_voiceover_tab()
         
+        # Transcription settings
+        self.setup_transcription_section()
+        
         # Progress Section
         self.setup_progress_section()
         
@@ -92,6 +115,15 @@ class VideoGeneratorGUI:
         )
         self.generate_vo_btn.pack(side='left', padx=5)
         
+        # Save Voiceover button (disabled until a voiceover exists)
+        self.save_vo_btn = ttk.Button(
+            story_controls,
+            text="Save Voiceover",
+            command=self.save_story_voiceover,
+            state='disabled'
+        )
+        self.save_vo_btn.pack(side='left', padx=5)
+        
         # File inputs frame
         file_frame = ttk.LabelFrame(self.story_tab, text="File Selection")
         file_frame.pack(fill='x', padx=10, pady=5)
@@ -120,6 +152,10 @@ class VideoGeneratorGUI:
         ttk.Entry(folder_frame, textvariable=self.video_folder_story).pack(side='left', padx=10, fill='x', expand=True)
         ttk.Button(folder_frame, text="Browse", 
                   command=lambda: self.browse_folder(self.video_folder_story)).pack(side='right', padx=10)
+        ttk.Button(folder_frame, text="Footage Library",
+                  command=lambda: self.open_footage_browser(self.video_folder_story.get())).pack(side='right')
+        ttk.Checkbutton(folder_frame, text="Draft (proxies)",
+                        variable=self.draft_render).pack(side='right', padx=10)
         
         # Add output file selection
         output_frame = ttk.Frame(file_frame)
@@ -138,6 +174,13 @@ class VideoGeneratorGUI:
         )
         self.generate_video_btn.pack(padx=10, pady=20)
         
+        # Align subtitles to the known story text instead of transcribing
+        ttk.Checkbutton(
+            file_frame,
+            text="Align subtitles to story text (faster, exact words)",
+            variable=self.align_story_script
+        ).pack(anchor='w', padx=20, pady=5)
+        
     def setup_voiceover_tab(self):
         # Voiceover file selection
         vo_frame = ttk.Frame(self.voiceover_tab)
@@ -147,6 +190,14 @@ class VideoGeneratorGUI:
         ttk.Button(vo_frame, text="Browse",
                   command=lambda: self.browse_file(self.voiceover_path, [("WAV files", "*.wav")])).pack(side='right', padx=10)
         
+        # Optional script selection for alignment mode
+        script_frame = ttk.Frame(self.voiceover_tab)
+        script_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Label(script_frame, text="Script (optional):").pack(side='left', padx=10)
+        ttk.Entry(script_frame, textvariable=self.script_path).pack(side='left', fill='x', expand=True)
+        ttk.Button(script_frame, text="Browse",
+                  command=lambda: self.browse_file(self.script_path, [("Text files", "*.txt")])).pack(side='right', padx=10)
+        
         # Background music selection
         bg_frame = ttk.Frame(self.voiceover_tab)
         bg_frame.pack(fill='x', padx=10, pady=5)
@@ -162,6 +213,10 @@ class VideoGeneratorGUI:
         ttk.Entry(folder_frame, textvariable=self.video_folder_vo).pack(side='left', padx=10, fill='x', expand=True)
         ttk.Button(folder_frame, text="Browse", 
                   command=lambda: self.browse_folder(self.video_folder_vo)).pack(side='right', padx=10)
+        ttk.Button(folder_frame, text="Footage Library",
+                  command=lambda: self.open_footage_browser(self.video_folder_vo.get())).pack(side='right')
+        ttk.Checkbutton(folder_frame, text="Draft (proxies)",
+                        variable=self.draft_render).pack(side='right', padx=10)
         
         # Add output file selection
         output_frame = ttk.Frame(self.voiceover_tab)
@@ -191,6 +246,45 @@ class VideoGeneratorGUI:
         if folder:
             var.set(folder)
             
+    def setup_transcription_section(self):
+        """Setup Whisper model size, int8 and thread count controls"""
+        settings_frame = ttk.LabelFrame(self.root, text="Transcription")
+        settings_frame.pack(fill='x', padx=10, pady=5)
+        
+        ttk.Label(settings_frame, text="Whisper Model:").pack(side='left', padx=10)
+        ttk.Combobox(
+            settings_frame,
+            textvariable=self.whisper_model,
+            values=MODEL_SIZES,
+            state='readonly',
+            width=10
+        ).pack(side='left', padx=5, pady=5)
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="int8 (CPU)",
+            variable=self.whisper_int8
+        ).pack(side='left', padx=10)
+        
+        ttk.Label(settings_frame, text="Threads:").pack(side='left', padx=(10, 5))
+        ttk.Spinbox(
+            settings_frame,
+            from_=1,
+            to=os.cpu_count() or 1,
+            textvariable=self.whisper_threads,
+            width=5
+        ).pack(side='left', padx=5)
+        
+        # Long voiceovers are split at pauses and transcribed in parallel
+        ttk.Label(settings_frame, text="Workers:").pack(side='left', padx=(10, 5))
+        ttk.Spinbox(
+            settings_frame,
+            from_=1,
+            to=os.cpu_count() or 1,
+            textvariable=self.whisper_workers,
+            width=5
+        ).pack(side='left', padx=5)
+        
     def setup_progress_section(self):
         """Setup progress bar and output log section"""
         progress_frame = ttk.LabelFrame(self.root, text="Progress")
@@ -232,7 +326,7 @@ class VideoGeneratorGUI:
 
     async def generate_from_story_async(self):
         try:
-            if not hasattr(self, 'temp_vo_file'):
+            if not hasattr(self, 'story_voiceover'):
                 messagebox.showerror("Error", "Please generate voiceover first")
                 return
             
@@ -240,15 +334,14 @@ class VideoGeneratorGUI:
             self.output_text.delete(1.0, tk.END)
             self.status_var.set("Generating video...")
 
-            # Use the temporary voiceover file
-            await self.generate_video(self.temp_vo_file, self.bg_music_story.get(), 
-                                   self.video_folder_story.get())
+            # Use the in-memory voiceover, aligned to its story text if enabled
+            script = self.story_script if self.align_story_script.get() else None
+            await self.generate_video(self.story_voiceover, self.bg_music_story.get(), 
+                                   self.video_folder_story.get(), script)
             
-            # Clean up temporary file
-            if hasattr(self, 'temp_vo_file') and os.path.exists(self.temp_vo_file):
-                if 'processed_vo_' in self.temp_vo_file:  # If it's a processed file
-                    os.remove(self.temp_vo_file)
-                delattr(self, 'temp_vo_file')
+            # Voiceover has been consumed
+            delattr(self, 'story_voiceover')
+            self.save_vo_btn.config(state='disabled')
             
             self.update_progress(100, "Video generation complete!")
             messagebox.showinfo("Success", "Video generated successfully!")
@@ -262,44 +355,69 @@ class VideoGeneratorGUI:
     def generate_from_story(self):
         asyncio.run(self.generate_from_story_async())
         
-    async def generate_video(self, audio_file, bg_music, video_folder):
+    async def generate_video(self, audio_file, bg_music, video_folder, script=None):
+        footage_executor = ThreadPoolExecutor(max_workers=1)
+        footage_future = None
         try:
             # Get volume adjustments based on active tab
             if self.notebook.select() == self.notebook.tabs()[0]:  # Story tab
+                vo_volume = self.vo_volume_story / 100.0
                 bg_volume = self.bg_volume_story / 100.0
-                vo_volume = 1.0  # Story generation doesn't use voiceover adjustment
+                auto_duck = self.auto_duck_story
+                ducking = self.ducking_story
             else:  # Voiceover tab
+                vo_volume = self.vo_volume_vo / 100.0
                 bg_volume = self.bg_volume_vo / 100.0
-                vo_volume = self.vo_volume / 100.0
-            
-            # Load and adjust audio files
-            vo_audio = AudioSegment.from_file(audio_file)
-            bg_audio = AudioSegment.from_file(bg_music)
-            
-            # Apply volume adjustments
-            vo_audio = vo_audio.apply_gain(20 * np.log10(vo_volume))
-            bg_audio = bg_audio.apply_gain(20 * np.log10(bg_volume))
-            
-            # Export adjusted audio
-            vo_audio.export("adjusted_vo.wav", format="wav")
-            bg_audio.export("adjusted_bg.wav", format="wav")
-            
-            # Use adjusted files
-            create_master_track("adjusted_vo.wav", "adjusted_bg.wav")
-            
-            # Transcribe audio
-            self.log_output("Loading Whisper model...")
-            model = whisper.load_model("base")
-            self.update_progress(35)
-            
-            self.log_output("Transcribing audio...")
-            result = model.transcribe(
-                audio_file,
-                language="en",
-                word_timestamps=True,
-                condition_on_previous_text=True,
-                temperature=0.0
-            )
+                auto_duck = self.auto_duck_vo
+                ducking = self.ducking_vo
+            
+            # Gain, overlay and truncate in one in-memory pass
+            vo_audio = open_audio(audio_file)
+            master_track = render_master_track(vo_audio, bg_music, vo_volume, bg_volume,
+                                               auto_duck=auto_duck, ducking=ducking)
+            
+            # Footage does not depend on the transcript, so prepare it in the
+            # background while Whisper runs and the transcript is edited
+            self.log_output("Preparing footage in the background...")
+            draft = self.draft_render.get()
+            footage_future = footage_executor.submit(prepare_footage, video_folder,
+                                                     master_track.duration, draft=draft)
+            
+            # Transcribe the unedited audio so deadspace cuts can be toggled
+            # and tuned without running Whisper again
+            source_audio, edls = unwrap_edits(vo_audio)
+            source_key = audio_identity(source_audio)
+            if script:
+                settings = (script, ALIGNMENT_MODEL, self.whisper_int8.get())
+            else:
+                settings = (None, self.whisper_model.get(), self.whisper_int8.get(),
+                            self.whisper_workers.get())
+            cache = self.transcript_cache
+            if cache is not None and cache[0] == source_key and cache[1] == settings:
+                self.log_output("Reusing the previous transcription")
+                result = cache[2]
+            elif script:
+                # Known script: only compute word timings
+                self.log_output("Loading Whisper alignment model...")
+                model = load_model(ALIGNMENT_MODEL, self.whisper_int8.get(),
+                                   self.whisper_threads.get())
+                self.update_progress(35)
+                
+                self.log_output("Aligning script to audio...")
+                result = align_script(model, whisper_input(source_audio), script)
+            else:
+                # Transcribe audio, in parallel chunks when it is long
+                self.log_output(f"Transcribing audio with Whisper ({self.whisper_model.get()})...")
+                self.update_progress(35)
+                result = transcribe_parallel(whisper_input(source_audio),
+                                             self.whisper_model.get(),
+                                             self.whisper_int8.get(),
+                                             self.whisper_threads.get(),
+                                             self.whisper_workers.get())
+            self.transcript_cache = (source_key, settings, result)
+            if edls:
+                # Move word timings onto the edited voiceover
+                result = remap_result(result, edls)
             self.update_progress(45, "Processing transcription...")
             
             # Process transcription
@@ -309,7 +427,7 @@ class VideoGeneratorGUI:
             
             # Show transcript editor
             self.log_output("Opening transcript editor...")
-            editor = TranscriptEditor(self.root, text_array)
+            editor = TranscriptEditor(self.root, text_array, footage_future, subtitle_scale(draft))
             self.root.wait_window(editor)
             
             if editor.edited:
@@ -322,57 +440,43 @@ class VideoGeneratorGUI:
             # Get output path based on active tab
             output_path = self.output_path_story.get() if self.notebook.select() == self.notebook.tabs()[0] else self.output_path_vo.get()
             
-            # Create video compilation with progress updates
-            await self.create_video_with_subtitles(video_folder, "master_track.wav", output_path, text_array)
+            # Only subtitle compositing waits on the transcript
+            if not footage_future.done():
+                self.log_output("Waiting for footage preparation to finish...")
+            footage_path = self.wait_for(footage_future)
+            self.update_progress(70, "Footage ready")
+            
+            # Add subtitles with progress updates
+            await self.create_video_with_subtitles(footage_path, master_track, output_path, text_array,
+                                                   subtitle_scale(draft))
             
             # Create clickable link
             self.create_file_link(os.path.abspath(output_path))
-            
-            # Cleanup
-            self.log_output("Cleaning up temporary files...")
-            os.remove("master_track.wav")
-            if audio_file != "result.wav":
-                os.remove(audio_file)
-            os.remove("adjusted_vo.wav")
-            os.remove("adjusted_bg.wav")
 
         except Exception as e:
             self.log_output(f"Error in generate_video: {str(e)}")
+            if footage_future is not None:
+                # Remove the footage once the background render finishes
+                footage_future.add_done_callback(
+                    lambda f: f.exception() is None and os.path.exists(f.result()) and os.remove(f.result()))
             raise e
+        finally:
+            footage_executor.shutdown(wait=False)
 
-    async def create_video_with_subtitles(self, video_folder, audio_path, output_path, text_array):
-        """Create video with subtitles and progress updates"""
+    def wait_for(self, future):
+        """Wait for a background task while keeping the window responsive"""
+        while not future.done():
+            self.root.update()
+            time.sleep(0.05)
+        return future.result()
+
+    async def create_video_with_subtitles(self, temp_video, audio, output_path, text_array, scale=1.0):
+        """Add subtitles to prepared footage with progress updates.
+
+        scale sizes the subtitles for footage smaller than the output.
+        """
+        from moviepy.editor import ImageSequenceClip
         try:
-            # Initial video compilation
-            self.log_output("Loading and processing video clips...")
-            audio = AudioFileClip(audio_path)
-            audio_duration = audio.duration
-
-            video_files = [os.path.join(video_folder, f) for f in os.listdir(video_folder) 
-                          if f.endswith('.mp4')]
-            random.shuffle(video_files)
-
-            self.log_output("Combining video clips...")
-            video_clips = []
-            current_duration = 0
-            for i, video_file in enumerate(video_files):
-                if current_duration >= audio_duration:
-                    break
-                self.log_output(f"Processing clip {i+1}/{len(video_files)}...")
-                clip = VideoFileClip(video_file).subclip(0)
-                video_clips.append(clip)
-                current_duration += clip.duration
-                self.update_progress(55 + (i/len(video_files))*10)
-
-            self.log_output("Creating initial video compilation...")
-            final_video = concatenate_videoclips(video_clips, method="compose")
-            final_video = final_video.set_audio(audio)
-            final_video = final_video.subclip(0, audio_duration)
-            
-            # Create temporary video
-            self.log_output("Rendering temporary video...")
-            temp_video = "temp_video.mp4"
-            final_video.write_videofile(temp_video, codec="libx264", fps=60)
             self.update_progress(70, "Adding subtitles...")
 
             # Create frames with subtitles
@@ -383,23 +487,9 @@ class VideoGeneratorGUI:
             self.log_output("Extracting frames and adding subtitles...")
             cap = cv2.VideoCapture(temp_video)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            # Constants for text rendering
-            FONT = cv2.FONT_HERSHEY_DUPLEX
-            FONT_SCALE_BASE = 2.0
-            FONT_THICKNESS = 8
-            STROKE_THICKNESS = 16
-            target_height = height * 0.25
-            max_width = width * 0.85
-            min_width = width * 0.6
-            
-            # Animation settings
-            ANIMATION_FRAMES = 3
-            last_text = None
-            animation_start = 0
-            current_scale = FONT_SCALE_BASE * 2
+            
+            # Same compositing as the subtitle preview
+            track = SubtitleTrack(text_array)
 
             for frame_count in range(total_frames):
                 if frame_count % 100 == 0:
@@ -411,57 +501,7 @@ class VideoGeneratorGUI:
                 if not ret:
                     break
 
-                # Find current text
-                current_text = None
-                for text_item in text_array:
-                    if frame_count >= text_item[1] and frame_count <= text_item[2]:
-                        if text_item[0] != last_text:
-                            animation_start = frame_count
-                            current_scale = FONT_SCALE_BASE
-                        current_text = text_item[0]
-                        last_text = current_text
-                        break
-
-                # If no text found, use last text
-                if not current_text and last_text:
-                    current_text = last_text
-
-                if current_text:
-                    # Handle long single words
-                    if len(current_text.split()) == 1 and len(current_text) > 15:
-                        current_text = current_text[:15] + "..."
-
-                    # Calculate animation progress
-                    if frame_count < animation_start + ANIMATION_FRAMES:
-                        progress = (frame_count - animation_start) / ANIMATION_FRAMES
-                        font_scale = FONT_SCALE_BASE + (FONT_SCALE_BASE * 2 - FONT_SCALE_BASE) * progress
-                    else:
-                        font_scale = FONT_SCALE_BASE * 2
-
-                    # Get text size
-                    text_size, _ = cv2.getTextSize(current_text, FONT, font_scale, FONT_THICKNESS)
-                    
-                    # Adjust font size to fit width and height
-                    safety_margin = 20
-                    while (text_size[0] > max_width - safety_margin or 
-                           text_size[1] > target_height - safety_margin):
-                        font_scale *= 0.98
-                        text_size, _ = cv2.getTextSize(current_text, FONT, font_scale, FONT_THICKNESS)
-
-                    # Calculate position for center of screen
-                    text_x = int((width - text_size[0]) / 2)
-                    text_y = int(height / 2 + text_size[1] / 3)
-
-                    # Draw black stroke/outline
-                    for dx, dy in [(-1,-1), (-1,1), (1,-1), (1,1), (0,1), (0,-1), (1,0), (-1,0)]:
-                        cv2.putText(frame, current_text, 
-                                  (text_x + dx*STROKE_THICKNESS//3, text_y + dy*STROKE_THICKNESS//3), 
-                                  FONT, font_scale, (0, 0, 0), STROKE_THICKNESS)
-                    
-                    # Draw white text
-                    cv2.putText(frame, current_text, (text_x, text_y), FONT, font_scale,
-                               (255, 255, 255), FONT_THICKNESS)
-
+                composite_frame(frame, track, frame_count, scale=scale)
                 cv2.imwrite(os.path.join(output_folder, f"{frame_count}.jpg"), frame)
 
             cap.release()
@@ -473,7 +513,7 @@ class VideoGeneratorGUI:
                            key=lambda x: int(x.split(".")[0]))
             
             clip = ImageSequenceClip([os.path.join(output_folder, image) for image in images], fps=60)
-            clip = clip.set_audio(AudioFileClip(audio_path))
+            clip = clip.set_audio(make_audio_clip(audio))
             
             self.log_output("Rendering final video...")
             clip.write_videofile(output_path)
@@ -498,11 +538,18 @@ class VideoGeneratorGUI:
                 messagebox.showerror("Error", "Please select a voiceover file")
                 return
                 
+            # Read the supplied script for alignment mode
+            script = None
+            if self.script_path.get():
+                with open(self.script_path.get(), encoding="utf-8") as f:
+                    script = f.read().strip() or None
+            
             # No longer process audio here - let mixer handle it
             self.update_progress(30, "Creating video...")
-            asyncio.run(self.generate_video(self.voiceover_path.get(), 
+            asyncio.run(self.generate_video(self.current_voiceover(), 
                                           self.bg_music_vo.get(), 
-                                          self.video_folder_vo.get()))
+                                          self.video_folder_vo.get(),
+                                          script))
             
             self.update_progress(100, "Video generation complete!")
             messagebox.showinfo("Success", "Video generated successfully!")
@@ -555,44 +602,86 @@ class VideoGeneratorGUI:
         """Open mixer settings window"""
         # Get the appropriate paths based on active tab
         if self.notebook.select() == self.notebook.tabs()[0]:  # Story tab
-            if not hasattr(self, 'temp_vo_file'):
+            if not hasattr(self, 'story_voiceover'):
                 messagebox.showerror("Error", "Please generate voiceover first")
                 return
             
-            vo_path = self.temp_vo_file  # Use the temporary voiceover file
+            vo_path = self.story_voiceover  # Use the in-memory voiceover
             bg_path = self.bg_music_story.get()
             if not os.path.exists(bg_path):
                 messagebox.showerror("Error", "Please select a background music file first")
                 return
-            initial_vo = 100
+            initial_vo = self.vo_volume_story
             initial_bg = self.bg_volume_story
+            auto_duck = self.auto_duck_story
+            ducking = self.ducking_story
         else:  # Voiceover tab
-            vo_path = self.voiceover_path.get()
+            vo_path = self.current_voiceover()
             bg_path = self.bg_music_vo.get()
-            if not os.path.exists(vo_path) or not os.path.exists(bg_path):
+            if not os.path.exists(self.voiceover_path.get()) or not os.path.exists(bg_path):
                 messagebox.showerror("Error", "Please select both audio files first")
                 return
-            initial_vo = self.vo_volume
+            initial_vo = self.vo_volume_vo
             initial_bg = self.bg_volume_vo
+            auto_duck = self.auto_duck_vo
+            ducking = self.ducking_vo
         
         # Create mixer window
         mixer = MixerSettingsWindow(self.root, vo_path, bg_path, 
                                    vo_volume=initial_vo, 
-                                   bg_volume=initial_bg)
+                                   bg_volume=initial_bg,
+                                   auto_duck=auto_duck,
+                                   ducking=ducking)
         self.root.wait_window(mixer)
         
         # Store the saved volumes and get processed audio path if available
-        vo_volume, bg_volume, processed_vo_path = mixer.get_volumes()
+        vo_volume, bg_volume, processed_vo_path, auto_duck = mixer.get_volumes()
         if self.notebook.select() == self.notebook.tabs()[0]:  # Story tab
-            self.vo_volume = vo_volume * 100
+            self.vo_volume_story = vo_volume * 100
             self.bg_volume_story = bg_volume * 100
-            if processed_vo_path != vo_path:  # If audio was processed
-                self.temp_vo_file = processed_vo_path  # Update to use processed audio
+            self.auto_duck_story = auto_duck
+            self.ducking_story = mixer.get_ducking()
+            if processed_vo_path is not vo_path:  # If audio was processed
+                self.story_voiceover = processed_vo_path  # Update to use processed audio
         else:  # Voiceover tab
-            self.vo_volume = vo_volume * 100
+            self.vo_volume_vo = vo_volume * 100
             self.bg_volume_vo = bg_volume * 100
-            if processed_vo_path != vo_path:  # If audio was processed
-                self.voiceover_path.set(processed_vo_path)  # Update to use processed audio
+            self.auto_duck_vo = auto_duck
+            self.ducking_vo = mixer.get_ducking()
+            if processed_vo_path is not vo_path:  # If audio was processed
+                # Keep the processed audio in memory for the selected file
+                self.processed_voiceover = (self.voiceover_path.get(), processed_vo_path)
+
+    def open_footage_browser(self, video_folder):
+        """Browse clips in the footage folder through their posters and proxies"""
+        if not os.path.isdir(video_folder):
+            messagebox.showerror("Error", "Please select a video clips folder first")
+            return
+        FootageBrowser(self.root, video_folder)
+
+    def current_voiceover(self):
+        """Voiceover tab audio: the mixer's processed buffer for the selected file, else its path"""
+        path = self.voiceover_path.get()
+        if self.processed_voiceover is not None and self.processed_voiceover[0] == path:
+            return self.processed_voiceover[1]
+        return path
+
+    def save_story_voiceover(self):
+        """Write the in-memory voiceover to a WAV file chosen by the user"""
+        if not hasattr(self, 'story_voiceover'):
+            messagebox.showerror("Error", "Please generate voiceover first")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".wav",
+            filetypes=[("WAV files", "*.wav"), ("All files", "*.*")]
+        )
+        if filename:
+            try:
+                self.story_voiceover.write_wav(filename)
+                self.log_output(f"Voiceover saved to: {filename}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save voiceover: {str(e)}")
 
     def rephrase_story(self):
         """Open dialog to rephrase the story using AI"""
@@ -642,14 +731,17 @@ class VideoGeneratorGUI:
             self.status_var.set("Generating voiceover...")
             self.log_output("Starting voiceover generation...")
             
-            # Generate temporary voiceover file
-            self.temp_vo_file = await process_story(story, False)
-            if not self.temp_vo_file:
+            # Generate voiceover in memory
+            voiceover = await process_story(story, False)
+            if voiceover is None:
                 messagebox.showerror("Error", "Failed to generate voiceover")
                 return
+            self.story_voiceover = voiceover
+            self.story_script = story
             
-            # Enable mixer and generate video buttons
+            # Enable mixer, save and generate video buttons
             self.mixer_btn.config(state='normal')
+            self.save_vo_btn.config(state='normal')
             self.generate_video_btn.config(state='normal')
             
             self.status_var.set("Voiceover generated successfully")
@@ -661,13 +753,17 @@ class VideoGeneratorGUI:
             self.status_var.set("Error occurred")
 
 class TranscriptEditor(tk.Toplevel):
-    def __init__(self, parent, transcript_data):
+    FOOTAGE_POLL_MS = 200
+
+    def __init__(self, parent, transcript_data, footage_future=None, subtitle_scale=1.0):
         super().__init__(parent)
         self.title("Edit Transcript")
         self.geometry("800x600")
         
         # Store transcript data
         self.transcript_data = transcript_data
+        self.footage_future = footage_future
+        self.subtitle_scale = subtitle_scale
         self.edited = False
         
         # Create widgets
@@ -696,14 +792,48 @@ class TranscriptEditor(tk.Toplevel):
         ttk.Button(button_frame, text="Save", command=self.save_changes).pack(side='right', padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side='right', padx=5)
         
-    def save_changes(self):
-        # Get edited text
+        # Subtitle preview, available once the background footage is ready
+        if self.footage_future is not None:
+            self.preview_button = ttk.Button(button_frame, text="Preview Subtitles",
+                                             command=self.preview_subtitles, state='disabled')
+            self.preview_button.pack(side='left', padx=5)
+            self.footage_status = ttk.Label(button_frame, text="Preparing footage...")
+            self.footage_status.pack(side='left', padx=5)
+            self.after(self.FOOTAGE_POLL_MS, self._poll_footage)
+        
+    def _poll_footage(self):
+        if not self.winfo_exists():
+            return
+        if not self.footage_future.done():
+            self.after(self.FOOTAGE_POLL_MS, self._poll_footage)
+        elif self.footage_future.exception() is not None:
+            self.footage_status.config(text="Footage preparation failed")
+        else:
+            self.preview_button.config(state='normal')
+            self.footage_status.config(text="")
+        
+    def edited_transcript(self):
+        """Copy of the transcript with the editor's current text and the original timing"""
         edited_text = self.text_editor.get("1.0", tk.END).strip().split('\n')
+        transcript = [list(segment) for segment in self.transcript_data]
+        for i, text in enumerate(edited_text):
+            if i < len(transcript):
+                transcript[i][0] = text
+        return transcript
+        
+    def preview_subtitles(self):
+        """Scrub the prepared footage with the current, unsaved edits applied"""
+        preview = SubtitlePreview(self, self.footage_future.result(), self.edited_transcript(),
+                                  self.subtitle_scale)
+        preview.grab_set()
+        self.wait_window(preview)
+        if self.winfo_exists():
+            self.grab_set()
         
+    def save_changes(self):
         # Update transcript data with edited text while preserving timing
-        for i, text in enumerate(edited_text):
-            if i < len(self.transcript_data):
-                self.transcript_data[i][0] = text
+        for segment, edited in zip(self.transcript_data, self.edited_transcript()):
+            segment[0] = edited[0]
         
         self.edited = True
         self.destroy()
@@ -713,6 +843,8 @@ class TranscriptEditor(tk.Toplevel):
         self.destroy()
 
 class RephraseDialog(tk.Toplevel):
+    POLL_MS = 50
+
     def __init__(self, parent, original_story):
         super().__init__(parent)
         self.title("AI Rephrased Story")
@@ -729,7 +861,12 @@ class RephraseDialog(tk.Toplevel):
         self.create_widgets()
         
         # Start rephrasing
-        self.rephrase_story()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        try:
+            self.rephrase_story()
+        except Exception:
+            self.destroy()
+            raise
         
     def create_widgets(self):
         # Text editor
@@ -746,47 +883,96 @@ class RephraseDialog(tk.Toplevel):
         
         ttk.Button(button_frame, text="Confirm", command=self.confirm).pack(side='right', padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side='right', padx=5)
-        
-    def rephrase_story(self):
+        self.stop_button = ttk.Button(button_frame, text="Stop", command=self.stop)
+        self.stop_button.pack(side='left', padx=5)
+        self.regenerate_button = ttk.Button(button_frame, text="Regenerate",
+                                            command=lambda: self.rephrase_story(regenerate=True))
+        self.regenerate_button.pack(side='left', padx=5)
+        
+    def rephrase_story(self, regenerate=False):
+        """Stream the rephrased story into the editor from a background job.
+
+        A stored rephrasing of the same story and settings is shown at once
+        unless regenerate is set.
+        """
+        self.job = RephraseJob(self.original_story)
+        cached = None if regenerate else self.job.cached()
+        if cached is not None:
+            self.text_editor.delete(1.0, tk.END)
+            self.text_editor.insert(tk.END, cached)
+            self.stop_button.config(state='disabled')
+            self.status_label.config(text="Loaded from cache. You can edit the text, or regenerate it")
+            return
+        
+        self.job.start()
+        self.text_editor.config(state='normal')
+        self.text_editor.delete(1.0, tk.END)
+        self.stop_button.config(state='normal')
+        self.regenerate_button.config(state='disabled')
+        self.status_label.config(text="Rephrasing story with AI...")
+        self.text_editor.config(state='disabled')
+        self.after(self.POLL_MS, self._poll_job)
+        
+    def _poll_job(self):
+        if not self.winfo_exists():
+            return
+        finished = changed = False
         try:
-            # Get AI response
-            try:
-                response = ollama.chat(model="mistral", messages=[{
-                    "role": "user",
-                    "content": f"Rephrase this story to make it more engaging and natural, keep the same length and structure: {self.original_story}"
-                }])
-            except Exception as model_error:
-                if "model not found" in str(model_error).lower():
-                    self.status_label.config(
-                        text="Model not found. Please run 'ollama pull mistral' in terminal first."
-                    )
-                    messagebox.showerror(
-                        "Model Not Found", 
-                        "The Mistral model needs to be downloaded first.\n\n"
-                        "Please open a terminal and run:\nollama pull mistral"
-                    )
-                else:
-                    self.status_label.config(text=f"Error: {str(model_error)}")
-                return
-            
-            rephrased_story = response['message']['content']
-            
-            # Show only the rephrased version
+            while True:
+                if self.job.updates.get_nowait() is None:
+                    finished = True
+                changed = True
+        except queue.Empty:
+            pass
+        
+        # Show the text received so far
+        self.text_editor.config(state='normal')
+        if changed:
             self.text_editor.delete(1.0, tk.END)
-            self.text_editor.insert(tk.END, rephrased_story)
-            
-            self.status_label.config(text="You can edit the text before confirming")
-            
-        except Exception as e:
-            self.status_label.config(text=f"Error: {str(e)}")
+            self.text_editor.insert(tk.END, self.job.text)
+            self.text_editor.see(tk.END)
+        
+        if not finished:
+            self.text_editor.config(state='disabled')
+            parts = len(self.job.chunks)
+            progress = f" ({self.job.finished_chunks}/{parts} parts done)" if parts > 1 else ""
+            self.status_label.config(text=f"Rephrasing story with AI...{progress}")
+            self.after(self.POLL_MS, self._poll_job)
+            return
+        
+        self.stop_button.config(state='disabled')
+        self.regenerate_button.config(state='normal')
+        error = self.job.error
+        if error is None:
+            if self.job.cancelled.is_set():
+                self.status_label.config(text="Stopped. You can edit the text before confirming")
+            else:
+                self.status_label.config(text="You can edit the text before confirming")
+        elif "not found" in str(error).lower() and "model" in str(error).lower():
+            self.status_label.config(
+                text="Model not found. Please run 'ollama pull mistral' in terminal first."
+            )
+            messagebox.showerror(
+                "Model Not Found", 
+                "The Mistral model needs to be downloaded first.\n\n"
+                "Please open a terminal and run:\nollama pull mistral"
+            )
+        else:
+            self.status_label.config(text=f"Error: {str(error)}")
             
+    def stop(self):
+        """Stop generating and keep the text received so far"""
+        self.job.cancel()
+        
     def confirm(self):
+        self.job.cancel()
         # Get the edited text and save it
         self.rephrased_text = self.text_editor.get(1.0, tk.END).strip()
         self.confirmed = True
         self.destroy()
         
     def cancel(self):
+        self.job.cancel()
         self.confirmed = False
         self.destroy()
 
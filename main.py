@@ -1,24 +1,55 @@
-import tkinter as tk
-from gui import VideoGeneratorGUI
+# Only light modules at the top: spawned transcription workers re-run this
+# module's imports, so the GUI and footage code are imported where used
 import sys
 import os
+import threading
+import importlib
 
-def check_dependencies():
-    """Check if required dependencies are installed and available"""
+# Seconds to wait for the Ollama service before reporting it unavailable
+OLLAMA_CHECK_TIMEOUT = 3.0
+
+# Heavy modules imported on first use; loaded in the background once the window is up
+WARM_MODULES = ("moviepy.editor", "whisper", "pygame", "ollama", "edge_tts")
+
+def check_ollama(timeout=OLLAMA_CHECK_TIMEOUT):
+    """Check that the Ollama service answers and the Mistral model is pulled.
+
+    Only lists the installed models, with a timeout, instead of running a
+    generation, so a missing or slow service costs at most timeout seconds.
+    """
     try:
-        # Check for Ollama service
         import ollama
-        try:
-            # Try to ping Ollama service
-            ollama.chat(model='mistral', messages=[{'role': 'system', 'content': 'test'}])
-        except ConnectionError:
-            print("Warning: Ollama service is not running. Some features may be limited.")
-            print("To use AI features, please start the Ollama service.")
-        except Exception as e:
-            if "model not found" in str(e).lower():
-                print("Warning: Mistral model not found. To use AI features, run: ollama pull mistral")
     except ImportError:
         print("Warning: Ollama not installed. To use AI features, install with: pip install ollama")
+        return
+
+    try:
+        models = ollama.Client(timeout=timeout).list()['models']
+    except Exception:
+        print("Warning: Ollama service is not running. Some features may be limited.")
+        print("To use AI features, please start the Ollama service.")
+        return
+
+    names = [model.get('model') or model.get('name') or '' for model in models]
+    if not any(name.split(':')[0] == 'mistral' for name in names):
+        print("Warning: Mistral model not found. To use AI features, run: ollama pull mistral")
+
+def warm_imports():
+    """Import the heavy modules ahead of first use, ignoring any that are missing"""
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+def check_dependencies():
+    """Check if required dependencies are installed and available.
+
+    Nothing here blocks startup: the Ollama check and the footage
+    library refresh run in background threads.
+    """
+    from footage_library import list_footage
+    threading.Thread(target=check_ollama, daemon=True).start()
 
     # Check for required folders and content
     if not os.path.exists("Background_Footage"):
@@ -27,18 +58,40 @@ def check_dependencies():
         print("Please add some video files (MP4, AVI, MOV, or MKV format) to the Background_Footage folder")
     else:
         # Check if folder has video files
-        video_files = [f for f in os.listdir("Background_Footage") 
-                      if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))]
+        video_files = list_footage("Background_Footage")
         if not video_files:
             print("Warning: No video files found in Background_Footage folder")
             print("Please add some video files (MP4, AVI, MOV, or MKV format) to the Background_Footage folder")
+        else:
+            # Probe new or changed clips in the background so renders only query the index
+            threading.Thread(target=refresh_footage_library, args=("Background_Footage",),
+                             daemon=True).start()
     
     # Check for default background music
     if not os.path.exists("bg_music.wav"):
         print("Note: Default background music 'bg_music.wav' not found")
 
+def refresh_footage_library(video_folder):
+    """Update the footage index, then build missing previews and normalised intermediates"""
+    from footage_library import FootageLibrary
+    try:
+        library = FootageLibrary(video_folder)
+        probed, removed = library.refresh()
+        if probed or removed:
+            print(f"Footage library updated: {probed} probed, {removed} removed")
+        previews = library.build_previews()
+        if previews:
+            print(f"Footage library: built previews for {previews} clips")
+        normalized = library.normalize()
+        if normalized:
+            print(f"Footage library: normalised {normalized} clips")
+    except Exception as e:
+        print(f"Warning: Could not update footage library: {e}")
+
 def main():
     """Initialize and run the application"""
+    import tkinter as tk
+    from gui import VideoGeneratorGUI
     try:
         # Check dependencies
         check_dependencies()
@@ -53,6 +106,9 @@ def main():
         # Create and initialize GUI
         app = VideoGeneratorGUI(root)
         
+        # Load heavy modules once the window is showing
+        root.after_idle(lambda: threading.Thread(target=warm_imports, daemon=True).start())
+        
         # Start the application
         root.mainloop()
         
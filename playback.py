@@ -0,0 +1,90 @@
+import numpy as np
+from audio_engine import to_int16
+
+# Frames converted at a time when preparing a Sound
+BLOCK_FRAMES = 65536
+
+def ensure_mixer(frame_rate, channels):
+    """Initialise pygame's mixer at the audio's own format so no resampling is needed.
+
+    allowedchanges=0 makes SDL convert to the device's format itself instead
+    of handing back a different one, which raw int16 buffers would play at
+    the wrong speed.
+    """
+    import pygame
+    if pygame.mixer.get_init() != (frame_rate, -16, channels):
+        if pygame.mixer.get_init():
+            pygame.mixer.quit()
+        pygame.mixer.init(frequency=frame_rate, size=-16, channels=channels, allowedchanges=0)
+
+def play_pcm(audio, gain=1.0):
+    """Play an in-memory PCMAudio with gain applied; returns the playing Sound"""
+    import pygame
+    channels = min(audio.channels, 2)
+    ensure_mixer(audio.frame_rate, channels)
+
+    # Convert block by block so long sources are never copied as a whole float array
+    pcm = np.empty((audio.num_frames, channels), dtype=np.int16)
+    for start in range(0, audio.num_frames, BLOCK_FRAMES):
+        pcm[start:start + BLOCK_FRAMES] = to_int16(audio.samples[start:start + BLOCK_FRAMES, :channels] * gain)
+    sound = pygame.mixer.Sound(buffer=pcm.tobytes())
+    sound.play()
+    return sound
+
+def is_playing(sound):
+    return sound is not None and sound.get_num_channels() > 0
+
+class LiveMix:
+    """Real-time playback of a MixEngine through a sounddevice callback.
+
+    Gains are read at every block, so slider moves are heard immediately,
+    and seek() jumps without re-rendering anything.
+    """
+    BLOCK_SIZE = 1024
+
+    def __init__(self, engine, vo_gain=1.0, bg_gain=1.0):
+        self.engine = engine
+        self.vo_gain = vo_gain
+        self.bg_gain = bg_gain
+        self.position = 0
+        self.stream = None
+
+    def start(self, seconds=0.0):
+        import sounddevice as sd
+        self.stop()
+        self.seek(seconds)
+        self.stream = sd.OutputStream(
+            samplerate=self.engine.frame_rate,
+            channels=self.engine.channels,
+            dtype='float32',
+            blocksize=self.BLOCK_SIZE,
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def seek(self, seconds):
+        self.position = int(min(max(seconds, 0.0), self.engine.duration) * self.engine.frame_rate)
+
+    @property
+    def time(self):
+        """Current playback position in seconds"""
+        return self.position / self.engine.frame_rate
+
+    @property
+    def active(self):
+        return self.stream is not None and self.stream.active
+
+    def _callback(self, outdata, frames, time_info, status):
+        import sounddevice as sd
+        block = self.engine.render(self.position, frames, self.vo_gain, self.bg_gain)
+        outdata[:len(block)] = block
+        outdata[len(block):] = 0
+        self.position += len(block)
+        if len(block) < frames:
+            raise sd.CallbackStop
@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+REPHRASE_MODEL = "mistral"
+REPHRASE_PROMPT = ("Rephrase this story to make it more engaging and natural, "
+                   "keep the same length and structure: {story}")
+
+# Long stories are rephrased as paragraph chunks of about this many characters
+CHUNK_MAX_CHARS = 2000
+REPHRASE_WORKERS = 3
+
+# Completed rephrasings, least recently used dropped beyond the entry limit
+REPHRASE_CACHE_PATH = os.path.join(".cache", "rephrase.sqlite3")
+REPHRASE_CACHE_ENTRIES = 200
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rephrasings (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+def split_paragraphs(text, max_chars=CHUNK_MAX_CHARS):
+    """Group a story's lines into chunks of at most max_chars.
+
+    Chunks are only cut at line breaks, so stories with single-newline
+    paragraphs are chunked too, and a line longer than max_chars becomes
+    a chunk of its own. Returns (chunks, breaks): breaks[i] is the line
+    break that followed chunks[i] in the story, for joining the rephrased
+    chunks with the same layout.
+    """
+    text = text.replace("\r\n", "\n").strip()
+    if not text:
+        return [], []
+    parts = re.split(r"(\n\s*)", text)
+    chunks, breaks = [], []
+    for line, line_break in zip(parts[::2], parts[1::2] + [""]):
+        if chunks and len(chunks[-1]) + len(breaks[-1]) + len(line) <= max_chars:
+            chunks[-1] += breaks[-1] + line
+            breaks[-1] = line_break
+        else:
+            chunks.append(line)
+            breaks.append(line_break)
+    return chunks, breaks
+
+def normalize_story(text):
+    """Story text with line endings unified and trailing whitespace removed, for cache keys"""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def rephrase_key(story, model, prompt, options=None, max_chars=CHUNK_MAX_CHARS):
+    """Cache key for everything that shapes a rephrasing"""
+    settings = [normalize_story(story), model, prompt, options or {}, max_chars]
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+class RephraseCache:
+    """Completed rephrasings on disk, keyed by rephrase_key.
+
+    Reads refresh an entry's last use and writes drop the least recently
+    used entries beyond max_entries. The database is only created on the
+    first write.
+    """
+    def __init__(self, path=REPHRASE_CACHE_PATH, max_entries=REPHRASE_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+
+    def _connect(self):
+        # One connection per call keeps the cache usable from any thread
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute(CACHE_SCHEMA)
+        return db
+
+    def get(self, key):
+        """Cached text for a key, or None"""
+        if not os.path.exists(self.path):
+            return None
+        with self._connect() as db:
+            row = db.execute("SELECT text FROM rephrasings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE rephrasings SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, text):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO rephrasings (key, text, last_used) VALUES (?, ?, ?)",
+                       (key, text, time.time()))
+            db.execute("DELETE FROM rephrasings WHERE key NOT IN "
+                       "(SELECT key FROM rephrasings ORDER BY last_used DESC LIMIT ?)",
+                       (self.max_entries,))
+
+rephrase_cache = RephraseCache()
+
+class RephraseJob:
+    """Rephrase a story with Ollama, streaming the text as it is generated.
+
+    The story is split into paragraph chunks which are rephrased
+    concurrently on worker threads. Every received token puts the chunk
+    index on `updates`, and None is put once the job is over, so a Tk
+    window can poll the queue. cancel() stops the streams at the next
+    token. host defaults to OLLAMA_HOST or the local service; point it at
+    a stand-in server to exercise the flow without a model. A job that
+    completes is stored in cache; pass cache=None to bypass it.
+    """
+    def __init__(self, story, model=REPHRASE_MODEL, host=None, prompt=REPHRASE_PROMPT,
+                 options=None, workers=REPHRASE_WORKERS, max_chars=CHUNK_MAX_CHARS,
+                 cache=rephrase_cache):
+        import ollama
+        self.client = ollama.Client(host=host)
+        self.model = model
+        self.prompt = prompt
+        self.options = options
+        self.workers = workers
+        self.cache = cache
+        self.key = rephrase_key(story, model, prompt, options, max_chars)
+        self.chunks, self.breaks = split_paragraphs(story, max_chars)
+        self.outputs = [""] * len(self.chunks)
+        self.finished_chunks = 0
+        self.error = None
+        self.updates = queue.Queue()
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Run the job on a background thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        """Rephrase every chunk, blocking until all are done, failed or cancelled"""
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(self.chunks)))) as pool:
+                for future in [pool.submit(self._rephrase_chunk, i) for i in range(len(self.chunks))]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Keep the first error and stop the other chunks
+                        if self.error is None:
+                            self.error = e
+                        self.cancelled.set()
+            if self.cache is not None and self.error is None and not self.cancelled.is_set():
+                self.cache.put(self.key, self.text)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.updates.put(None)
+
+    def _rephrase_chunk(self, index):
+        if self.cancelled.is_set():
+            return
+        stream = self.client.chat(model=self.model, stream=True, options=self.options, messages=[{
+            "role": "user",
+            "content": self.prompt.format(story=self.chunks[index])
+        }])
+        try:
+            for part in stream:
+                if self.cancelled.is_set():
+                    return
+                with self.lock:
+                    self.outputs[index] += part['message']['content']
+                self.updates.put(index)
+        finally:
+            stream.close()
+        with self.lock:
+            self.finished_chunks += 1
+
+    def cached(self):
+        """The stored rephrasing for this story and these settings, or None"""
+        return self.cache.get(self.key) if self.cache is not None else None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def done(self):
+        return self.thread is not None and not self.thread.is_alive()
+
+    @property
+    def text(self):
+        """Rephrased text received so far, chunks joined with the story's own line breaks"""
+        with self.lock:
+            return "".join(output.strip() + line_break
+                           for output, line_break in zip(self.outputs, self.breaks)
+                           if output.strip()).strip()
+
+def rephrase_with_ollama(story, **kwargs):
+    """Rephrase a story and return the text, from the cache when it has it; raises if any chunk fails"""
+    job = RephraseJob(story, **kwargs)
+    cached = job.cached()
+    if cached is not None:
+        return cached
+    job.run()
+    if job.error is not None:
+        raise job.error
+    return job.text
@@ -0,0 +1,143 @@
+import heapq
+import math
+from bisect import bisect_right
+from functools import lru_cache
+import cv2
+
+# Subtitle style
+FONT = cv2.FONT_HERSHEY_DUPLEX
+FONT_SCALE_BASE = 2.0
+FONT_THICKNESS = 8
+STROKE_THICKNESS = 16
+TEXT_HEIGHT_RATIO = 0.25   # Target text height as a fraction of the frame height
+TEXT_WIDTH_RATIO = 0.85    # Maximum text width as a fraction of the frame width
+SAFETY_MARGIN = 20
+ANIMATION_FRAMES = 3       # Frames for the text to grow to full size
+MAX_WORD_LENGTH = 15       # Longer single words are truncated
+
+class SubtitleTrack:
+    """Subtitle cues looked up by frame number.
+
+    text_array holds [text, start_frame, end_frame] cues. At any frame the
+    first cue in the list covering it is shown, and between cues the last
+    shown text stays up, exactly as a sequential pass over the frames would
+    see it. The timeline is split once into runs of constant text, so any
+    frame can be looked up on its own, in any order.
+    """
+    def __init__(self, text_array):
+        # Boundaries where the set of covering cues changes
+        events = []
+        for index, (text, start, end) in enumerate(text_array):
+            start, end = math.ceil(start), math.floor(end)
+            if start <= end:
+                events.append((start, index))
+                events.append((end + 1, index))
+        boundaries = sorted({frame for frame, _ in events})
+        starts = sorted((start, index) for start, index in events[::2])
+        ends = {index: frame for frame, index in events[1::2]}
+
+        # Sweep the boundaries keeping the covering cues in list order
+        self.run_starts = []
+        self.run_texts = []
+        self.run_animation_starts = []
+        active = []
+        next_start = 0
+        last_text = None
+        animation_start = 0
+        for frame in boundaries:
+            while next_start < len(starts) and starts[next_start][0] <= frame:
+                heapq.heappush(active, starts[next_start][1])
+                next_start += 1
+            while active and ends[active[0]] <= frame:
+                heapq.heappop(active)
+            if active:
+                text = text_array[active[0]][0]
+                if text != last_text:
+                    animation_start = frame
+                last_text = text
+            if last_text is None:
+                continue
+            self.run_starts.append(frame)
+            self.run_texts.append(last_text)
+            self.run_animation_starts.append(animation_start)
+
+    def cue_at(self, frame):
+        """(text, animation start frame) shown at a frame, text None before the first cue"""
+        run = bisect_right(self.run_starts, frame) - 1
+        if run < 0:
+            return None, 0
+        return self.run_texts[run], self.run_animation_starts[run]
+
+@lru_cache(maxsize=1024)
+def fit_text(text, font_scale, max_width, max_height, font=FONT, thickness=FONT_THICKNESS,
+             margin=SAFETY_MARGIN):
+    """Shrink a font scale until the text fits; returns (font_scale, text_size)"""
+    text_size, _ = cv2.getTextSize(text, font, font_scale, thickness)
+    while (text_size[0] > max_width - margin or
+           text_size[1] > max_height - margin):
+        font_scale *= 0.98
+        text_size, _ = cv2.getTextSize(text, font, font_scale, thickness)
+    return font_scale, text_size
+
+def draw_subtitle(frame, text, age, font=FONT, font_scale_base=FONT_SCALE_BASE,
+                  font_thickness=FONT_THICKNESS, stroke_thickness=STROKE_THICKNESS, scale=1.0):
+    """Draw a subtitle onto a BGR frame in place.
+
+    age is the number of frames since the text appeared, which drives the
+    grow-in animation. scale shrinks the font, strokes and margin for
+    frames smaller than the output, such as draft proxies, so they look
+    like the final render.
+    """
+    if not text:
+        return frame
+    height, width = frame.shape[:2]
+    font_scale_base *= scale
+    font_thickness = max(1, round(font_thickness * scale))
+    stroke_thickness = max(1, round(stroke_thickness * scale))
+
+    # Handle long single words
+    if len(text.split()) == 1 and len(text) > MAX_WORD_LENGTH:
+        text = text[:MAX_WORD_LENGTH] + "..."
+
+    # Calculate animation progress
+    if age < ANIMATION_FRAMES:
+        progress = age / ANIMATION_FRAMES
+        font_scale = font_scale_base + (font_scale_base * 2 - font_scale_base) * progress
+    else:
+        font_scale = font_scale_base * 2
+
+    # Adjust font size to fit width and height
+    font_scale, text_size = fit_text(text, font_scale, width * TEXT_WIDTH_RATIO,
+                                     height * TEXT_HEIGHT_RATIO, font, font_thickness,
+                                     SAFETY_MARGIN * scale)
+
+    # Calculate position for center of screen
+    text_x = int((width - text_size[0]) / 2)
+    text_y = int(height / 2 + text_size[1] / 3)  # Slightly above center
+
+    # Draw black stroke/outline (draw text in 8 directions)
+    for dx, dy in [(-1,-1), (-1,1), (1,-1), (1,1), (0,1), (0,-1), (1,0), (-1,0)]:
+        cv2.putText(frame, text,
+                    (text_x + dx*stroke_thickness//3, text_y + dy*stroke_thickness//3),
+                    font, font_scale, (0, 0, 0), stroke_thickness)
+
+    # Draw white text
+    cv2.putText(frame, text, (text_x, text_y), font, font_scale,
+                (255, 255, 255), font_thickness)
+    return frame
+
+def composite_frame(frame, track, frame_index, **style):
+    """Draw the subtitle shown at frame_index onto a frame; used by both render and preview"""
+    text, animation_start = track.cue_at(frame_index)
+    return draw_subtitle(frame, text, frame_index - animation_start, **style)
+
+def read_frame(capture, frame_index):
+    """Decode a single frame by seeking; returns None past the end.
+
+    Reads straight on when the capture is already at frame_index, so
+    stepping forward one frame does not seek.
+    """
+    if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) != frame_index:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    ret, frame = capture.read()
+    return frame if ret else None
@@ -0,0 +1,444 @@
+import os
+import re
+import sys
+import time
+import json
+import argparse
+import difflib
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+SAMPLE_RATE = 16000
+MODEL_SIZES = ["tiny", "tiny.en", "base", "base.en", "small", "small.en"]
+TRANSCRIPTION_MODEL = "base"
+ALIGNMENT_MODEL = "tiny"
+
+# Parallel transcription settings
+PARALLEL_MIN_SECONDS = 120   # Shorter audio is transcribed in a single pass
+CHUNK_MIN_SECONDS = 60       # Chunks are at least this long
+MIN_SILENCE_MS = 300         # Only split inside silences at least this long
+
+# Script alignment settings
+ALIGN_WORD_SURPLUS = 1.5     # Words offered to a window, relative to the expected count
+ALIGN_WINDOW_MARGIN = 1.0    # Words must end this many seconds before a window's end
+
+_models = {}
+
+# Worker pool kept between parallel transcriptions, with the settings it was started with
+_pool = None
+_pool_settings = None
+_pool_lock = threading.Lock()
+
+def load_model(name=TRANSCRIPTION_MODEL, quantize=False, threads=None):
+    """Load a Whisper model once per process.
+
+    With quantize=True the model runs on CPU with its linear layers
+    dynamically quantized to int8. threads sets torch's intra-op thread count.
+    torch and whisper are only imported here, on first use, so importing
+    this module stays cheap.
+    """
+    import torch
+    import whisper
+    if name not in MODEL_SIZES:
+        raise Exception(f"Unsupported Whisper model '{name}'. Choose one of: {', '.join(MODEL_SIZES)}")
+    if threads:
+        torch.set_num_threads(int(threads))
+
+    key = (name, quantize)
+    if key not in _models:
+        if quantize:
+            _models[key] = _quantize_int8(whisper.load_model(name, device="cpu"))
+        else:
+            _models[key] = whisper.load_model(name)
+    return _models[key]
+
+def _quantize_int8(model):
+    """Dynamically quantize a Whisper model's linear layers to int8"""
+    import torch
+    # Whisper uses its own nn.Linear subclass, which quantize_dynamic skips,
+    # so swap in plain nn.Linear layers with the same weights first
+    for module in list(model.modules()):
+        for name, child in module.named_children():
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                plain = torch.nn.Linear(child.in_features, child.out_features,
+                                        bias=child.bias is not None)
+                plain.load_state_dict(child.state_dict())
+                setattr(module, name, plain)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def transcribe(model, audio):
+    """Free-form transcription with word-level timestamps"""
+    return model.transcribe(
+        audio,
+        language="en",
+        word_timestamps=True,
+        condition_on_previous_text=True,
+        temperature=0.0,
+        fp16=model.device.type == "cuda"
+    )
+
+def transcribe_parallel(audio, name=TRANSCRIPTION_MODEL, quantize=False, threads=None, workers=1):
+    """Transcribe long audio as silence-bounded chunks in a process pool.
+
+    Chunks are cut in the middle of pauses found by VAD, so no word is split,
+    and their word timestamps are shifted back onto the global timeline.
+    Short audio, or a single worker, falls back to one sequential pass.
+    """
+    if isinstance(audio, str):
+        import whisper
+        audio = whisper.load_audio(audio)
+    duration = len(audio) / SAMPLE_RATE
+    threads = threads or os.cpu_count() or 1
+
+    chunks = []
+    if workers > 1 and duration >= PARALLEL_MIN_SECONDS:
+        chunks = split_at_silences(audio, max(CHUNK_MIN_SECONDS, duration / (workers * 2)))
+
+    if len(chunks) < 2:
+        return transcribe(load_model(name, quantize, threads), audio)
+
+    print(f"Transcribing {len(chunks)} chunks on {min(workers, len(chunks))} workers...")
+    pool = _worker_pool(name, quantize, max(1, threads // workers), workers)
+    try:
+        results = list(pool.map(_transcribe_chunk, [audio[start:end] for start, end in chunks]))
+    except Exception:
+        # A crashed worker breaks the pool, so start a fresh one next time
+        shutdown_pool()
+        raise
+
+    return merge_results(results, [start / SAMPLE_RATE for start, _ in chunks])
+
+def _worker_pool(name, quantize, threads, workers):
+    """The shared transcription pool, restarted only when its settings change.
+
+    Each worker loads the model once, in the pool initializer, and keeps it
+    for every later transcription. The threads are split between workers;
+    spawn keeps Tk and torch state out of the children.
+    """
+    global _pool, _pool_settings
+    settings = (name, quantize, threads, workers)
+    with _pool_lock:
+        if _pool is None or _pool_settings != settings:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker,
+                                        initargs=(name, quantize, threads))
+            _pool_settings = settings
+        return _pool
+
+@atexit.register
+def shutdown_pool():
+    """Stop the transcription workers"""
+    global _pool, _pool_settings
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_settings = None
+
+def split_at_silences(audio, target_seconds):
+    """Cut 16 kHz audio into (start, end) sample ranges of at least target_seconds at pauses"""
+    from audio_engine import vad_speech_mask
+    frame_ms = 10
+    frame_size = SAMPLE_RATE * frame_ms // 1000
+    speech = vad_speech_mask(audio, SAMPLE_RATE, frame_ms=frame_ms)
+
+    # Silent runs as [start, end) frame ranges
+    edges = np.diff(np.concatenate(([0], (~speech).astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    long_runs = (run_ends - run_starts) * frame_ms >= MIN_SILENCE_MS
+    cut_points = ((run_starts[long_runs] + run_ends[long_runs]) // 2) * frame_size
+
+    # Take the first pause after each chunk reaches the target length
+    target = int(target_seconds * SAMPLE_RATE)
+    boundaries = [0]
+    for cut in cut_points:
+        if cut - boundaries[-1] >= target and len(audio) - cut >= target // 2:
+            boundaries.append(int(cut))
+    boundaries.append(len(audio))
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def merge_results(results, offsets):
+    """Merge chunk transcriptions into one result on the global timeline"""
+    segments = []
+    for result, offset in zip(results, offsets):
+        for segment in result["segments"]:
+            segment = dict(segment)
+            segment["id"] = len(segments)
+            segment["start"] += offset
+            segment["end"] += offset
+            segment["words"] = [dict(word, start=word["start"] + offset, end=word["end"] + offset)
+                                for word in segment.get("words", [])]
+            segments.append(segment)
+
+    return {
+        "text": "".join(result["text"] for result in results),
+        "segments": segments,
+        "language": results[0].get("language", "en") if results else "en"
+    }
+
+def remap_result(result, edls):
+    """Move a transcription's timings through edit decision lists, in order.
+
+    All segment and word times are mapped in one vectorised pass per edit,
+    so a cached transcription follows deadspace removal without running
+    Whisper again.
+    """
+    segments = [dict(segment, words=[dict(word) for word in segment.get("words", [])])
+                for segment in result["segments"]]
+    items = segments + [word for segment in segments for word in segment["words"]]
+    starts = np.array([item["start"] for item in items], dtype=np.float64)
+    ends = np.array([item["end"] for item in items], dtype=np.float64)
+    for edl in edls:
+        starts, ends = edl.map_times(starts), edl.map_times(ends)
+    for item, start, end in zip(items, starts.tolist(), ends.tolist()):
+        item["start"], item["end"] = start, end
+    return dict(result, segments=segments)
+
+def _init_worker(name, quantize, threads):
+    global _worker_model
+    _worker_model = load_model(name, quantize, threads)
+
+def _transcribe_chunk(audio):
+    return transcribe(_worker_model, audio)
+
+def align_script(model, audio, script):
+    """Compute word timings for a known script by forced alignment.
+
+    The script is tokenized and aligned to the audio one 30 second window
+    at a time with whisper's cross-attention DTW, so no text is decoded.
+    Each window is given more script words than it is likely to hold, and
+    only the words that end well inside it are kept; the next window starts
+    at the first word that was not. The returned segments contain the
+    script's exact words in whisper's result format.
+    """
+    import whisper
+    from whisper.audio import N_FRAMES, N_SAMPLES, FRAMES_PER_SECOND
+    from whisper.timing import find_alignment
+    from whisper.tokenizer import get_tokenizer
+    if isinstance(audio, str):
+        audio = whisper.load_audio(audio)
+
+    script_words = script.split()
+    if not script_words:
+        return {"text": "", "segments": []}
+
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                              language="en", task="transcribe")
+    word_tokens = [tokenizer.encode(f" {word}") for word in script_words]
+    max_tokens = model.dims.n_text_ctx - len(tokenizer.sot_sequence) - 2
+
+    mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+    total_frames = mel.shape[-1] - N_FRAMES
+    margin = ALIGN_WINDOW_MARGIN * FRAMES_PER_SECOND
+
+    timings = []
+    seek = 0
+    while len(timings) < len(script_words):
+        first = len(timings)
+        offset = seek / FRAMES_PER_SECOND
+        num_frames = min(N_FRAMES, total_frames - seek)
+        if num_frames < 2:
+            # Out of audio: the remaining words get no duration at the end
+            timings.extend([(offset, offset)] * (len(script_words) - first))
+            break
+        window = whisper.pad_or_trim(mel[:, seek:seek + N_FRAMES], N_FRAMES).to(model.device)
+
+        # Over-estimate the words in this window from the remaining speaking rate
+        remaining = len(script_words) - first
+        count = int(remaining * N_FRAMES / (total_frames - seek) * ALIGN_WORD_SURPLUS) + 1
+        count = _fit_tokens(word_tokens, first, count, max_tokens)
+        while True:
+            spans = _align_words(find_alignment, model, tokenizer, word_tokens[first:first + count],
+                                 window, num_frames)
+            if num_frames < N_FRAMES and count == remaining:
+                # The rest of the script in the rest of the audio
+                keep = count
+                break
+            keep = sum(end * FRAMES_PER_SECOND <= num_frames - margin for _, end in spans)
+            if keep < count or count == remaining:
+                break
+            # Every word fit, so the window was offered too few and they were stretched
+            more = _fit_tokens(word_tokens, first, count * 2, max_tokens)
+            if more == count:
+                break
+            count = more
+
+        if keep == 0:
+            # Nothing fits: skip ahead to the first word, or take it when it starts the window
+            start = spans[0][0]
+            if start * FRAMES_PER_SECOND >= margin:
+                seek += int(start * FRAMES_PER_SECOND)
+                continue
+            keep = 1
+        timings.extend((offset + start, offset + end) for start, end in spans[:keep])
+        if keep < len(spans):
+            seek += max(1, int(spans[keep][0] * FRAMES_PER_SECOND))
+        else:
+            seek += num_frames
+
+    words = [{"word": f" {text}", "start": start, "end": end}
+             for text, (start, end) in zip(script_words, timings)]
+    return {"text": script, "segments": _group_sentences(words)}
+
+def _fit_tokens(word_tokens, first, count, max_tokens):
+    """Largest word count from first, at most count, whose tokens fit the decoder context"""
+    count = min(count, len(word_tokens) - first)
+    total = 0
+    for index, tokens in enumerate(word_tokens[first:first + count]):
+        total += len(tokens)
+        if total > max_tokens:
+            return max(1, index)
+    return count
+
+def _align_words(find_alignment, model, tokenizer, word_tokens, mel, num_frames):
+    """(start, end) seconds within the window for each script word's tokens.
+
+    whisper splits punctuation into words of its own, so its words are
+    folded back into the script words their tokens belong to.
+    """
+    alignment = find_alignment(model, tokenizer, [t for tokens in word_tokens for t in tokens],
+                               mel, num_frames)
+    boundaries = np.cumsum([len(tokens) for tokens in word_tokens])
+    spans = [None] * len(word_tokens)
+    position = 0
+    for timing in alignment:
+        index = int(np.searchsorted(boundaries, position, side='right'))
+        start, end = float(timing.start), float(timing.end)
+        spans[index] = (spans[index][0], end) if spans[index] else (start, end)
+        position += len(timing.tokens)
+
+    # Words whose tokens got no timing take the end of the previous word
+    previous = 0.0
+    for index, span in enumerate(spans):
+        spans[index] = span or (previous, previous)
+        previous = spans[index][1]
+    return spans
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+def _group_sentences(words):
+    """Group aligned words into sentence segments"""
+    segments = []
+    current = []
+    for word in words:
+        current.append(word)
+        if re.search(r"[.!?][\"')\]]*$", word["word"]):
+            segments.append(current)
+            current = []
+    if current:
+        segments.append(current)
+
+    return [{
+        "start": seg[0]["start"],
+        "end": seg[-1]["end"],
+        "text": "".join(w["word"] for w in seg),
+        "words": seg
+    } for seg in segments]
+
+def result_words(result):
+    """Flatten a whisper result into a list of word dicts"""
+    return [word for segment in result["segments"] for word in segment.get("words", [])]
+
+def timing_accuracy(words, reference, tolerance=0.1):
+    """Compare word timings against reference timings.
+
+    Returns the word error rate and, over words matched to the reference,
+    the mean absolute start error in seconds and the fraction of words
+    starting within tolerance seconds.
+    """
+    ref_norm = [_normalize(w["word"]) for w in reference]
+    hyp_norm = [_normalize(w["word"]) for w in words]
+    matcher = difflib.SequenceMatcher(None, ref_norm, hyp_norm, autojunk=False)
+
+    errors = 0
+    offsets = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            offsets.extend(abs(words[j]["start"] - reference[i]["start"])
+                           for i, j in zip(range(i1, i2), range(j1, j2)))
+        else:
+            errors += max(i2 - i1, j2 - j1)
+
+    return {
+        "wer": errors / max(len(reference), 1),
+        "mean_start_error": sum(offsets) / len(offsets) if offsets else float('nan'),
+        "within_tolerance": sum(o <= tolerance for o in offsets) / max(len(reference), 1)
+    }
+
+def benchmark(audio_path, settings, reference=None, threads=None):
+    """Time each (model, quantize) setting on one audio file and score its word timings.
+
+    Without a reference, the last setting's words serve as the reference,
+    so list the most accurate setting last.
+    """
+    import whisper
+    audio = whisper.load_audio(audio_path)
+    duration = len(audio) / SAMPLE_RATE
+
+    runs = []
+    for name, quantize in settings:
+        print(f"Benchmarking {name}{' int8' if quantize else ''}...")
+        load_start = time.perf_counter()
+        model = load_model(name, quantize, threads)
+        load_time = time.perf_counter() - load_start
+
+        start = time.perf_counter()
+        words = result_words(transcribe(model, audio))
+        elapsed = time.perf_counter() - start
+        runs.append((name, quantize, load_time, elapsed, words))
+
+    if reference is None:
+        reference = runs[-1][4]
+
+    rows = []
+    for name, quantize, load_time, elapsed, words in runs:
+        row = {
+            "model": name,
+            "int8": quantize,
+            "load_seconds": load_time,
+            "seconds": elapsed,
+            "realtime_factor": duration / elapsed if elapsed else float('inf')
+        }
+        row.update(timing_accuracy(words, reference))
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Whisper settings on your own audio")
+    parser.add_argument("--benchmark", metavar="AUDIO", required=True,
+                        help="audio file to transcribe")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"],
+                        choices=MODEL_SIZES, help="model sizes to compare")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch thread count")
+    parser.add_argument("--reference", metavar="JSON",
+                        help="reference word timings: a list of {word, start, end}")
+    args = parser.parse_args()
+
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+
+    # Run each size quantized then in fp32; fp32 of the last size is the default reference
+    settings = [(name, quantize) for name in args.models for quantize in (True, False)]
+    rows = benchmark(args.benchmark, settings, reference, args.threads)
+
+    print(f"{'model':<10}{'int8':<6}{'load s':>8}{'run s':>8}{'x RT':>7}"
+          f"{'WER':>7}{'start err':>11}{'<=100ms':>9}")
+    for row in rows:
+        print(f"{row['model']:<10}{'yes' if row['int8'] else 'no':<6}"
+              f"{row['load_seconds']:>8.1f}{row['seconds']:>8.1f}{row['realtime_factor']:>7.1f}"
+              f"{row['wer']:>7.1%}{row['mean_start_error']:>10.3f}s{row['within_tolerance']:>9.1%}")
+
+if __name__ == "__main__":
+    sys.exit(main())
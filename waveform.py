@@ -0,0 +1,119 @@
+import numpy as np
+
+class PeakPyramid:
+    """Multi-resolution min/max peaks of an audio signal for waveform display.
+
+    Level 0 holds the min and max of every BASE_BLOCK samples, and each
+    following level halves the resolution of the one before. Built once per
+    loaded file, so drawing costs depend on the display width, not on the
+    audio length.
+    """
+    BASE_BLOCK = 256
+
+    # Samples read at a time when building the base level
+    CHUNK_BLOCKS = 4096
+
+    def __init__(self, samples, frame_rate):
+        mins, maxs = self.base_level(samples)
+        self._build(mins, maxs, frame_rate, len(samples))
+
+    @classmethod
+    def progressive(cls, samples, frame_rate, updates=8):
+        """Yield pyramids of a growing prefix of samples, about updates of them.
+
+        Each pyramid covers the samples read so far and the last one covers
+        them all, so a waveform can be drawn while a long file is scanned.
+        """
+        chunk = cls.BASE_BLOCK * cls.CHUNK_BLOCKS
+        step = max(chunk, -(-len(samples) // max(updates, 1)) // chunk * chunk)
+        min_parts, max_parts = [], []
+        for start in range(0, len(samples), step):
+            block = samples[start:start + step]
+            mins, maxs = cls.base_level(block)
+            min_parts.append(mins)
+            max_parts.append(maxs)
+            pyramid = cls.__new__(cls)
+            pyramid._build(np.concatenate(min_parts), np.concatenate(max_parts),
+                           frame_rate, start + len(block))
+            yield pyramid
+        if not min_parts:
+            yield cls(samples, frame_rate)
+
+    @classmethod
+    def base_level(cls, samples):
+        """Min and max of every BASE_BLOCK samples, read chunk by chunk so
+        memory-mapped sources stay on disk"""
+        chunk = cls.BASE_BLOCK * cls.CHUNK_BLOCKS
+        min_chunks, max_chunks = [], []
+        for start in range(0, len(samples), chunk):
+            block = np.asarray(samples[start:start + chunk], dtype=np.float32)
+            if block.ndim == 2:
+                # Envelope over all channels
+                lows, highs = block.min(axis=1), block.max(axis=1)
+            else:
+                lows, highs = block, block
+            min_chunks.append(cls._reduce(lows, cls.BASE_BLOCK, np.minimum))
+            max_chunks.append(cls._reduce(highs, cls.BASE_BLOCK, np.maximum))
+        if not min_chunks:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(min_chunks), np.concatenate(max_chunks)
+
+    def _build(self, mins, maxs, frame_rate, num_samples):
+        self.frame_rate = frame_rate
+        self.num_samples = num_samples
+
+        self.levels = [(mins, maxs)]
+        while len(mins) > 1:
+            mins = self._reduce(mins, 2, np.minimum)
+            maxs = self._reduce(maxs, 2, np.maximum)
+            self.levels.append((mins, maxs))
+
+        top_mins, top_maxs = self.levels[-1]
+        self.peak = float(max(abs(top_mins.min()), abs(top_maxs.max()))) if len(top_mins) else 0.0
+
+    @property
+    def duration(self):
+        return self.num_samples / self.frame_rate
+
+    @staticmethod
+    def _reduce(values, block, reducer):
+        """Combine every block values with reducer, keeping a partial last block"""
+        if len(values) == 0:
+            return values
+        full = len(values) // block * block
+        reduced = reducer.reduce(values[:full].reshape(-1, block), axis=1)
+        if full < len(values):
+            reduced = np.append(reduced, reducer.reduce(values[full:]))
+        return reduced
+
+    def peaks(self, num_points, start=0.0, end=None):
+        """Get at most num_points (times, mins, maxs) covering start..end seconds"""
+        end = self.duration if end is None else min(end, self.duration)
+        start = max(0.0, start)
+        num_points = max(1, int(num_points))
+        span = max(end - start, 0.0) * self.frame_rate
+
+        # Coarsest level that still has at least one bin per point
+        level = 0
+        block = self.BASE_BLOCK
+        while level + 1 < len(self.levels) and span / (block * 2) >= num_points:
+            level += 1
+            block *= 2
+        mins, maxs = self.levels[level]
+
+        first = int(start * self.frame_rate // block)
+        last = int(np.ceil(end * self.frame_rate / block))
+        mins, maxs = mins[first:last], maxs[first:last]
+
+        # Group remaining bins so no more than num_points are drawn
+        group = int(np.ceil(len(mins) / num_points)) if len(mins) else 1
+        if group > 1:
+            mins = self._reduce(mins, group, np.minimum)
+            maxs = self._reduce(maxs, group, np.maximum)
+        times = (first + np.arange(len(mins)) * group) * block / self.frame_rate
+        return times, mins, maxs
+
+    def envelope(self, num_points, start=0.0, end=None):
+        """Get (x, y) of a zigzag line through the min/max peaks, ready to plot"""
+        times, mins, maxs = self.peaks(num_points, start, end)
+        return np.repeat(times, 2), np.column_stack((mins, maxs)).ravel()